@@ -5,17 +5,31 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
+import regex as re
 
 from __init__ import INDEX_DICT
+from build_manifest import record_file, record_input
+from build_profiler import PROFILER
+from html_stream import RawStream, write_document
+from path_resolver import PATH_RESOLVER
+from placement_registry import PLACEMENT_REGISTRY
+from sequence_store import get_sequence_index
+from sequence_store import make_packed_path, read_html_body, render_packed_sequence
+from text_catalog import TEXT_CATALOG
+from taxa_store import TAXA_STORE
 
 class AbstractPage(ABC):
     '''Builder class for a given bird species.
     '''
+    # merge runs of equally colored nucleotides into one span
+    COALESCE_NUCLEOTIDES = True
+    # write rephrased svgs once as shared files instead of pasting them into each page
+    EXTERNAL_SVGS = False
+
     def __init__(self, language="EN", stop_html_init=False):
         '''Initiaize object with a given name.
         '''
-        self.BIRD_DATA = pd.read_csv(INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_INFO"], sep=";")
+        self.BIRD_DATA = TAXA_STORE.get_table(language)
         
         self.lang = language
 
@@ -33,13 +47,22 @@ class AbstractPage(ABC):
         return title
     
 
+    def get_bird_row(self, bird_name):
+        '''Select the data of a bird from the whole `BIRD_DATA`.
+        '''
+        return TAXA_STORE.get_row(self.lang, bird_name)
+
+    def make_relative_path(self, file_name):
+        '''Build the path of a file relative to the html page.
+        '''
+        return PATH_RESOLVER.relpath(file_name, os.path.dirname(self.make_page_path()))
+
     def make_img_path(self):
         '''Build name of path for bird image.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PAGE_IMG_DIR"],
-                f"{self.name}.png")
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        file_name = PATH_RESOLVER.resolve(self.lang, "BIRD_PAGE_IMG_DIR", f"{self.name}.png")
+        record_file(file_name)
+        return self.make_relative_path(file_name)
 
 # HTML functions
     def initiate_html(self):
@@ -48,6 +71,7 @@ class AbstractPage(ABC):
         self.doc = dm.document(title=self.make_title())
         return
 
+    @PROFILER.profiled("build_html")
     def build_html(self):
         '''Build html document with head and body.
         '''
@@ -85,19 +109,20 @@ class AbstractPage(ABC):
     def define_stylesheet(self):
         '''Define the style sheet for the html head.
         '''
-        css_rawpaths = [
-                os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["SEQUENCES"],
-                "styles.css"),
-                os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["CSS_DIR"],
-                'two_columns.css')]
-        for i, css_rawpath in enumerate(css_rawpaths):
-            css_path = os.path.relpath(os.path.abspath(css_rawpath),
-                    os.path.dirname(self.make_page_path()))
+        for css_rawpath in self.get_stylesheets():
+            css_path = self.make_relative_path(css_rawpath)
             link(rel=f'stylesheet', href=css_path)
         return
 
+    def get_stylesheets(self):
+        '''Return the paths of all style sheets.
+        '''
+        css_rawpaths = [
+                PATH_RESOLVER.resolve(self.lang, "SEQUENCES", "styles.css"),
+                PATH_RESOLVER.resolve(self.lang, "CSS_DIR", 'two_columns.css')]
+        for css_rawpath in css_rawpaths : record_file(css_rawpath)
+        return css_rawpaths
+
     def define_jscript(self):
         '''Define the style js script for the html head.
         '''
@@ -108,14 +133,12 @@ class AbstractPage(ABC):
     def make_lang_links(self):
         '''Add the links between greek and english.
         '''
-        langlink = lambda lg: os.path.relpath(
-                undef_path.replace(f"/{self.lang.lower()}/", f"/{lg.lower()}/"), 
-                os.path.dirname(undef_path))
+        langlink = lambda lg: self.make_relative_path(
+                undef_path.replace(f"/{self.lang.lower()}/", f"/{lg.lower()}/"))
         undef_path = self.make_page_path()
        
         # here we load the language texts for each language
-        file_basics = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "basics.yml")
-        text_basics = yaml.safe_load(open(file_basics, "r"))
+        text_basics = TEXT_CATALOG.get_texts(self.lang, "basics")
         all_languages = [ln.lower() for ln in INDEX_DICT.keys() if len(ln)==2]
         with div(cls="language_choice", align="right"):
             p(text_basics["changelang"]["FILL_IN"])
@@ -128,13 +151,18 @@ class AbstractPage(ABC):
 
     def save_html(self, force=False):
         '''Save html document as a file.
+
+        Large raw blocks (sequences, svgs) are streamed into the file,
+        they are never rendered into one string with the document.
         '''
         file_name = self.make_page_path()
         parent_dir = os.path.dirname(file_name)
-        if not os.path.exists(parent_dir) : os.makedirs(parent_dir)
+        # pages can be built in parallel, so the directory may appear meanwhile
+        if not os.path.exists(parent_dir) : os.makedirs(parent_dir, exist_ok=True)
         if not os.path.exists(file_name) or force:
-            with open(file_name, "w") as html_file:
-                html_file.write(str(self.doc))
+            with PROFILER.span("write_html"):
+                with open(file_name, "w") as html_file:
+                    write_document(self.doc, html_file)
         else:
             print(f"Html document {self.name}.html already exists.")
         return
@@ -142,84 +170,142 @@ class AbstractPage(ABC):
     def get_sequence(self, bird_name=None):
         '''Load short sequence for bird.
         '''
-        seq_file = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["SEQUENCES"],
-                "list.html")
+        seq_file = PATH_RESOLVER.resolve(self.lang, "SEQUENCES", "list.html")
         seq = fetch_sequences(bird_name, seq_file)
         return seq
 
+    def get_sequences(self, bird_names):
+        '''Load short sequences for multiple birds.
+        '''
+        seq_file = PATH_RESOLVER.resolve(self.lang, "SEQUENCES", "list.html")
+        return get_sequence_index(seq_file).get_sequences(bird_names)
+
     def paste_svg(self, svg_file_name):
         '''Paste the code of a svg file into the html code.
         '''
-        from dominate.svg import svg
-        from dominate.util import raw
         #assert os.path.exists(svg_file_name), f"Image {svg_file_name} does not exist."
-        with open(svg_file_name, "r") as image:
-            svg_base_dir = os.path.dirname(svg_file_name)
-            for line in image.readlines():
-                std_line = self.standardize_path(line, svg_base_dir)
-                raw(std_line)
+        if not os.path.exists(svg_file_name):
+            raise FileNotFoundError(f"File '{svg_file_name}' does not exist.")
+        record_file(svg_file_name)
+        RawStream(chunks=lambda: self.iter_svg_lines(svg_file_name))
         return
 
     
     def paste_svg_io(self, svg_file_name, svg_io):
         '''Paste the code of a svg file into the html code.
+
+        With `EXTERNAL_SVGS`, the svg is written to a shared file that
+        the page refers to.
+        '''
+        from dominate.tags import object_
+        record_input("option:EXTERNAL_SVGS")
+        if not self.EXTERNAL_SVGS:
+            RawStream(chunks=lambda: self.iter_svg_lines(svg_file_name, svg_io=svg_io))
+            return
+        asset_path = self.save_svg_asset(svg_file_name, svg_io)
+        object_(type="image/svg+xml",
+                data=self.make_relative_path(asset_path))
+        return
+
+    def make_svg_asset_path(self, svg_file_name):
+        '''Build the path of the shared file of a svg.
+        '''
+        return PATH_RESOLVER.resolve(self.lang, "TREE_HTML_DIR", os.path.basename(svg_file_name))
+
+    def save_svg_asset(self, svg_file_name, svg_io):
+        '''Write a svg to its shared file with links relative to that file.
+
+        All pages that show the same svg share the file, so it is only
+        written if its content changed.
+        '''
+        asset_path = self.make_svg_asset_path(svg_file_name)
+        asset_dir = os.path.dirname(asset_path)
+        # the page css is not available within the svg, so the svg links it itself
+        css_lines = [
+                f'<?xml-stylesheet type="text/css" href="{PATH_RESOLVER.relpath(css, asset_dir)}"?>\n'
+                for css in self.get_stylesheets()]
+        svg_lines = list(self.iter_svg_lines(svg_file_name, svg_io=svg_io, target_dir=asset_dir))
+        has_declaration = bool(svg_lines) and svg_lines[0].startswith("<?xml")
+        svg_lines[int(has_declaration):int(has_declaration)] = css_lines
+        # the svg is embedded as object, so its links have to load the whole page
+        svg_str = FRAME_TARGET_RE.sub(r"target\1\2_top\2", "".join(svg_lines))
+        assert not FRAME_TARGET_RE.search(svg_str), f"Svg {asset_path} still opens links in its frame."
+
+        if _SVG_ASSETS.get(asset_path) != svg_str:
+            try:
+                with open(asset_path, "r") as asset : is_new = asset.read() != svg_str
+            except FileNotFoundError : is_new = True
+            if is_new:
+                os.makedirs(asset_dir, exist_ok=True)
+                # pages that share the file can be built in parallel
+                tmp_path = f"{asset_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as asset:
+                    asset.write(svg_str)
+                os.replace(tmp_path, asset_path)
+            _SVG_ASSETS[asset_path] = svg_str
+        # a page is rebuilt, if its svg file went missing
+        record_file(asset_path)
+        return asset_path
+
+    def iter_svg_lines(self, svg_file_name, svg_io=None, target_dir=None):
+        '''Read the lines of a svg (from file or io) with standardized links.
         '''
-        from dominate.svg import svg
-        from dominate.util import raw
         svg_base_dir = os.path.dirname(svg_file_name)
-        for line in svg_io.readlines():
-            std_line = self.standardize_path(line, svg_base_dir)
-            raw(std_line)
+        if svg_io is not None:
+            svg_io.seek(0)
+            for line in svg_io : yield self.standardize_path(line, svg_base_dir, target_dir)
+            return
+        with open(svg_file_name, "r") as image:
+            for line in image : yield self.standardize_path(line, svg_base_dir, target_dir)
         return
 
 
-    def standardize_path(self, svg_line, svg_base_dir):
+    @PROFILER.profiled("standardize_path", trace=False)
+    def standardize_path(self, svg_line, svg_base_dir, target_dir=None):
         '''Change the path link of a line within an svg image.
-        '''
-        import regex as re
-        LINK_RE = 'href\=\"([^\"]*)\"'
-        match = re.search(LINK_RE, svg_line)
 
+        Links are made relative to `target_dir`, by default the directory of the page.
+        '''
         # as the internal path of the svg file could be different
         # from our html file, we reassign all links...
-        if not match : return svg_line
-        link = match[1]
-        link_abs = os.path.abspath(os.path.join(svg_base_dir, link))
-        std_path = os.path.dirname(self.make_page_path())
-        link_rel = os.path.relpath(link_abs, std_path)
-        return svg_line.replace(link, link_rel)
+        if target_dir is None : target_dir = os.path.dirname(self.make_page_path())
+        return PATH_RESOLVER.rewrite_svg_line(svg_line, svg_base_dir, target_dir)
 
     def show_seq(self):
         '''Add the large sequence to the HMTL document.
+
+        The sequence is only loaded when the page is saved.
         '''
-        from dominate.util import raw
-        try : seq = self.load_long_sequence()
-        except FileNotFoundError : return False
-        else : raw(seq)
+        if not self.has_long_sequence() : return False
+        RawStream(chunks=lambda: [self.load_long_sequence()])
         return True
 
+    def has_long_sequence(self):
+        '''Check if the long sequence of the bird exists, packed or as html.
+        '''
+        seq_file = PATH_RESOLVER.resolve(self.lang, "SEQUENCES", f"{self.name}.html")
+        packed_file = make_packed_path(seq_file)
+        # both are recorded, so the page is built again once either appears
+        record_file(packed_file)
+        record_file(seq_file)
+        return os.path.exists(packed_file) or os.path.exists(seq_file)
+
+    @PROFILER.profiled("load_long_sequence")
     def load_long_sequence(self):
         '''Obtain the long nucleotide sequence of a given bird species.
         '''
-        seq_file = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["SEQUENCES"],
-                f"{self.name}.html")
-        body = []
-        body_bool = False
-        with open(seq_file, "r") as html:
-            for line in html.readlines():
-                if line.startswith("</body>") : return "".join(body)
-                if body_bool : body.append(line)
-                elif line.startswith("<body>") : body_bool = True
-        raise RuntimeError("Html file is not proper in its structure.")
+        seq_file = PATH_RESOLVER.resolve(self.lang, "SEQUENCES", f"{self.name}.html")
+        # packed sequences are rendered to html on the fly
+        packed_file = make_packed_path(seq_file)
+        if os.path.exists(packed_file):
+            return render_packed_sequence(packed_file, coalesce=self.COALESCE_NUCLEOTIDES)
+        return read_html_body(seq_file)
 
 
     def define_back(self):
         '''Make a small button that returns the user to the last page.
         '''
-        file_basics = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "basics.yml")
-        text_basics = yaml.safe_load(open(file_basics, "r"))
+        text_basics = TEXT_CATALOG.get_texts(self.lang, "basics")
         with form():
             input_(
                 type="button",
@@ -230,24 +316,19 @@ class AbstractPage(ABC):
 
 ###############
 # helpers
+# content of the shared svg files this process wrote or checked
+_SVG_ASSETS = {}
+# links of a shared svg must not open in the frame of the svg
+FRAME_TARGET_RE = re.compile(r'target(\s*=\s*)(["\'])_(?:self|blank)\2')
+
 def get_placement_species_list(language="EN"):
     '''Return a list of bird species that are used for the placement.
     '''
-    pm_dir = INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"]
-    bird_sp_list = [
-            fl.replace("tree_","").replace("_question.svg", "") for fl in
-            os.listdir(pm_dir) if fl.endswith("_question.svg")]
-    return bird_sp_list
+    record_input(f"placement:{language}")
+    return list(PLACEMENT_REGISTRY.get_species(language))
 
 
 def fetch_sequences(bird_alias, seq_html_path):
     '''Fetch the html formatted sequence for a bird alias.
     '''
-    with open(seq_html_path,"r") as sf:
-        lines = sf.readlines()
-        for line in lines:
-            if line.startswith("<dt>"):
-                short_line = line.replace("<dt>","")
-                name, seq = short_line.split("</dt>")
-                if name == bird_alias : return seq
-    raise ValueError(f"There is no sequence available for {bird_alias}.")
+    return get_sequence_index(seq_html_path).get_sequence(bird_alias)
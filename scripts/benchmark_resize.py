@@ -0,0 +1,97 @@
+# this script compares the resize engines of napari_utils on synthetic
+# crops of photos. for each engine and photo size it reports the time,
+# the peak memory and the PSNR against the skimage engine, which is the
+# reference.
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from napari_utils import RESIZE_ENGINES
+
+# sizes of the synthetic photos in megapixels
+MEGAPIXELS = [5, 20, 40]
+REFERENCE_ENGINE = "skimage"
+
+def make_crop(megapixels, seed=42):
+    '''Make the square crop of a 3:2 photo as uint8 rgb with gradients, fine texture and noise.
+    '''
+    rng = np.random.default_rng(seed)
+    height = width = int(np.sqrt(megapixels * 1e6 * 2 / 3))
+    rows = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    cols = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    crop = np.empty((height, width, 3), dtype=np.uint8)
+    for channel in range(3):
+        # feathers are the fine texture, the background the gradient
+        values = 80 * rows + 60 * cols * channel
+        values += 40 * np.sin(cols * (200 + 50 * channel)) * np.cos(rows * 150)
+        values += rng.normal(60, 15, size=(height, width)).astype(np.float32)
+        crop[:, :, channel] = np.clip(values, 0, 255)
+    return crop
+
+def as_uint8(image):
+    '''Convert the output of an engine to uint8 as it would be saved.
+    '''
+    if image.dtype == np.uint8 : return image
+    return np.clip(np.rint(image * 255), 0, 255).astype(np.uint8)
+
+def psnr(reference, image):
+    '''Return the peak signal-to-noise ratio of an image in dB.
+    '''
+    mse = np.mean((reference.astype(np.float64) - image.astype(np.float64)) ** 2)
+    if mse == 0 : return float("inf")
+    return 10 * np.log10(255 ** 2 / mse)
+
+def bench_engine(engine, crop, size, repeats=3):
+    '''Time an engine and trace its peak memory, returns the results and the resized image.
+    '''
+    resize_function = RESIZE_ENGINES[engine]
+    # memory is traced in a separate run, tracing slows numpy down
+    tracemalloc.start()
+    image = as_uint8(resize_function(crop, square_pixel_size=size))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        resize_function(crop, square_pixel_size=size)
+        seconds.append(time.perf_counter() - start)
+    return {"min": min(seconds), "peak_mb": peak / 1e6}, image
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Compare the resize engines on synthetic crops of photos.")
+    parser.add_argument("-m", "--megapixels", type=float, nargs="+", default=MEGAPIXELS,
+            help="sizes of the synthetic photos in megapixels")
+    parser.add_argument("-s", "--size", type=int, default=550,
+            help="edge length of the resized images in pixels")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+            help="number of timed runs per engine")
+    parser.add_argument("-o", "--output", default=None,
+            help="write the results to this json file")
+    args = parser.parse_args()
+
+    results = {}
+    for megapixels in args.megapixels:
+        crop = make_crop(megapixels)
+        results[str(megapixels)] = {}
+        reference = None
+        # the reference engine runs first, so the others can be compared to it
+        for engine in sorted(RESIZE_ENGINES, key=lambda name: name != REFERENCE_ENGINE):
+            result, image = bench_engine(engine, crop, args.size, repeats=args.repeats)
+            if reference is None : reference = image
+            result["psnr"] = psnr(reference, image)
+            results[str(megapixels)][engine] = result
+            print(f"{megapixels:>6} MP {engine:<10}{result['min']*1000:>10.1f} ms"
+                  f"{result['peak_mb']:>10.1f} MB{result['psnr']:>10.2f} dB")
+
+    if args.output is not None:
+        with open(args.output, "w") as out_file:
+            json.dump(results, out_file, indent=4)
+    return
+
+if __name__ == "__main__":
+    main()
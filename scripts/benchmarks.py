@@ -0,0 +1,266 @@
+# this file contains benchmarks for the hot paths of the page build.
+# they run on synthetic websites of a given number of species (see
+# make_fixtures.py) and their results can be stored as json and
+# compared with the results of an earlier run.
+
+import argparse
+from html.parser import HTMLParser
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+
+from __init__ import INDEX_DICT
+from build_site import enumerate_jobs, PAGE_TYPES
+from make_fixtures import EXAMPLE_BIRD, FixtureSite
+from path_resolver import PATH_RESOLVER
+from placement_registry import PLACEMENT_REGISTRY
+from routes import ROUTES
+import sequence_store
+from sequence_store import load_packed_sequence, render_sequence_html
+from svg_cache import SVG_CACHE
+from taxa_store import TAXA_STORE
+from text_catalog import TEXT_CATALOG
+
+SCALES = [50, 500, 5000]
+# a benchmark is a regression if it got slower by this factor and
+# by more than the noise of the timer
+REGRESSION_FACTOR = 1.2
+REGRESSION_MIN_SECONDS = 0.002
+
+class DOMCounter(HTMLParser):
+    '''Count the nodes a browser builds for a html snippet.
+    '''
+    def __init__(self):
+        '''Initialize with zero counts.
+        '''
+        super().__init__()
+        self.elements = 0
+        self.text_nodes = 0
+        return
+
+    def handle_starttag(self, tag, attrs):
+        self.elements += 1
+        return
+
+    def handle_startendtag(self, tag, attrs):
+        self.elements += 1
+        return
+
+    def handle_data(self, data):
+        self.text_nodes += 1
+        return
+
+    def count(self, html):
+        '''Return the numbers of elements and text nodes of a html snippet.
+        '''
+        self.feed(html)
+        self.close()
+        return {"elements": self.elements, "text_nodes": self.text_nodes}
+# end DOMCounter
+
+# helpers
+def activate_index(index_dict):
+    '''Point all modules to another website and drop everything they loaded.
+
+    INDEX_DICT is shared by all modules, so it is changed in place.
+    '''
+    INDEX_DICT.clear()
+    INDEX_DICT.update(index_dict)
+    TAXA_STORE.clear()
+    PATH_RESOLVER.clear()
+    ROUTES.clear()
+    PLACEMENT_REGISTRY.clear()
+    TEXT_CATALOG.__init__()
+    SVG_CACHE.__init__()
+    sequence_store._SEQUENCE_INDICES.clear()
+    return
+
+def measure(function, repeats=3):
+    '''Time a function, returns the fastest and the mean of all runs.
+    '''
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return {"min": min(seconds), "mean": sum(seconds) / len(seconds), "repeats": repeats}
+
+def get_paths(language="EN"):
+    '''Return the paths of a language.
+    '''
+    return INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]
+
+def get_tree_path(language="EN"):
+    '''Return the path of the tree svg of a language.
+    '''
+    return os.path.join(get_paths(language)["BIRD_PLACEMENT_IMG_DIR"], "tree.svg")
+
+# benchmarks
+def bench_sequence_rendering(bird_name=EXAMPLE_BIRD, repeats=10):
+    '''Compare rendering a long sequence with one span per site and coalesced spans.
+    '''
+    packed_file = os.path.join(get_paths()["SEQUENCES"], f"{bird_name}.nt2")
+    sequence = load_packed_sequence(packed_file)
+    results = {}
+    for mode, coalesce in [("per_site", False), ("coalesced", True)]:
+        html = render_sequence_html(sequence, coalesce=coalesce)
+        seconds = timeit.timeit(
+                lambda: render_sequence_html(sequence, coalesce=coalesce), number=repeats)
+        results[mode] = {
+            "bytes": len(html.encode("utf-8")),
+            "seconds": seconds / repeats,
+            **DOMCounter().count(html)
+        }
+    return results
+
+def bench_fetch_sequences(repeats=3):
+    '''Fetch the sequence fragments of all species, including loading the index.
+    '''
+    from abstract_page import fetch_sequences
+    seq_file = os.path.join(get_paths()["SEQUENCES"], "list.html")
+    with open(get_paths()["BIRD_NAMES"], "r") as nf:
+        bird_names = [name.strip() for name in nf if name.strip()]
+    def fetch_all():
+        sequence_store._SEQUENCE_INDICES.clear()
+        for bird_name in bird_names : fetch_sequences(bird_name, seq_file)
+    return measure(fetch_all, repeats=repeats)
+
+def bench_rephrase(repeats=3):
+    '''Rephrase the tree svg with the profiles of all species, bypassing the svg cache.
+    '''
+    from rephrase_svg import TightSVG
+    tsvg = TightSVG(get_tree_path(), language="EN")
+    return measure(lambda: tsvg.rephrase(use_cache=False), repeats=repeats)
+
+def bench_ateam(repeats=3):
+    '''Construct one ATeam per <a> element of the tree svg.
+    '''
+    from rephrase_svg import ATeam, TightSVG
+    a_strs = TightSVG(get_tree_path(), language="EN").a_strs
+    def construct_all():
+        for a_str in a_strs : ATeam(a_str, language="EN")
+    return measure(construct_all, repeats=repeats)
+
+def bench_break_line(repeats=3):
+    '''Break the texts of all species into lines of a profile.
+    '''
+    from rephrase_svg import break_line
+    texts = [str(text) for text in TAXA_STORE.get_table("EN")["text"]]
+    def break_all():
+        for text in texts : break_line(text, 40, correction=4)
+    return measure(break_all, repeats=repeats)
+
+def bench_standardize_path(repeats=3):
+    '''Standardize the links of all lines of the tree svg for a page.
+    '''
+    from title_page import TitlePage
+    page = TitlePage(language="EN")
+    tree_path = get_tree_path()
+    with open(tree_path, "r") as svg_file:
+        lines = svg_file.readlines()
+    svg_base_dir = os.path.dirname(tree_path)
+    def standardize_all():
+        for line in lines : page.standardize_path(line, svg_base_dir)
+    return measure(standardize_all, repeats=repeats)
+
+def bench_pages(repeats=3):
+    '''Build and save one page of each page class.
+
+    Rephrased svgs are cached after the first run, as in a real build.
+    '''
+    results = {}
+    for page_type in PAGE_TYPES:
+        module_name, class_name, _, bird_name = enumerate_jobs([page_type], ["EN"])[0]
+        page_class = getattr(importlib.import_module(module_name), class_name)
+        def build():
+            if bird_name is None : page = page_class(language="EN")
+            else : page = page_class(bird_name, language="EN")
+            page.build_html()
+            page.save_html(force=True)
+        results[class_name] = measure(build, repeats=repeats)
+    return results
+
+def run_benchmarks(species_count, fixture_dir, repeats=3):
+    '''Run all benchmarks on a synthetic website with a given number of species.
+    '''
+    site_dir = os.path.join(fixture_dir, f"species_{species_count}")
+    index_dict = INDEX_DICT.copy()
+    activate_index(FixtureSite(site_dir, species_count).make())
+    try:
+        results = {
+            "fetch_sequences": bench_fetch_sequences(repeats=repeats),
+            "rephrase_svg": bench_rephrase(repeats=repeats),
+            "ateam": bench_ateam(repeats=repeats),
+            "break_line": bench_break_line(repeats=repeats),
+            "standardize_path": bench_standardize_path(repeats=repeats),
+        }
+        for class_name, result in bench_pages(repeats=repeats).items():
+            results[f"page:{class_name}"] = result
+        for mode, result in bench_sequence_rendering(repeats=repeats).items():
+            results[f"sequence_rendering:{mode}"] = {
+                    "min": result["seconds"], "mean": result["seconds"], "repeats": repeats,
+                    "bytes": result["bytes"], "elements": result["elements"]}
+    finally : activate_index(index_dict)
+    return results
+
+def compare_results(results, previous, factor=REGRESSION_FACTOR,
+                    min_seconds=REGRESSION_MIN_SECONDS):
+    '''List the benchmarks that got slower than in a previous run.
+
+    Returns tuples of (scale, benchmark, previous seconds, seconds).
+    '''
+    regressions = []
+    for scale, benchmarks in results["scales"].items():
+        for name, result in benchmarks.items():
+            try : before = previous["scales"][scale][name]["min"]
+            except KeyError : continue
+            if result["min"] > before*factor and result["min"] - before > min_seconds:
+                regressions.append((scale, name, before, result["min"]))
+    return regressions
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the page build on synthetic websites.")
+    parser.add_argument("-s", "--scales", type=int, nargs="+", default=SCALES,
+            help="numbers of species of the synthetic websites")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+            help="number of runs per benchmark")
+    parser.add_argument("-d", "--fixture-dir", default=None,
+            help="directory to keep the synthetic websites in (temporary by default)")
+    parser.add_argument("-o", "--output", default=None,
+            help="write the results to this json file")
+    parser.add_argument("-c", "--compare", default=None,
+            help="json file of an earlier run to check for regressions")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "scales": {}}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixture_dir = tmp_dir if args.fixture_dir is None else args.fixture_dir
+        for scale in args.scales:
+            results["scales"][str(scale)] = run_benchmarks(scale, fixture_dir, repeats=args.repeats)
+            for name, result in results["scales"][str(scale)].items():
+                print(f"{scale:>6} species {name:<36}{result['min']*1000:>10.1f} ms")
+
+    if args.output is not None:
+        with open(args.output, "w") as out_file:
+            json.dump(results, out_file, indent=4)
+    if args.compare is not None:
+        with open(args.compare, "r") as prev_file:
+            regressions = compare_results(results, json.load(prev_file))
+        for scale, name, before, after in regressions:
+            print(f"Regression at {scale} species in {name}: "
+                  f"{before*1000:.1f} ms -> {after*1000:.1f} ms", file=sys.stderr)
+        if regressions : sys.exit(1)
+    return
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,11 @@ from dominate.tags import *
 import os
 import pandas as pd
 from abstract_page import AbstractPage
-import yaml
 
 from __init__ import INDEX_DICT
+from routes import ROUTES
+from taxa_store import TAXA_STORE
+from text_catalog import TEXT_CATALOG
 
 class BirdPage(AbstractPage):
     '''Builder class for a given bird species.
@@ -28,20 +30,19 @@ class BirdPage(AbstractPage):
     def check_name(self, bird_name):
         '''Check if bird name is in list.
         '''
-        return self.BIRD_DATA["CODE"].str.match(bird_name).any()
+        return TAXA_STORE.has_code(self.lang, bird_name)
 
     def get_data(self):
         '''Select the data of the bird name from the whole `BIRD_DATA`.
         '''
-        self.data = self.BIRD_DATA[self.BIRD_DATA["CODE"]==self.name].squeeze()
+        self.data = self.get_bird_row(self.name)
         return
 
 
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "birdpage.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "birdpage")
 
         # this can be edited.
         # so far, we simply take the latin name.
@@ -54,10 +55,7 @@ class BirdPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_HTML_DIR"],
-                f"{self.name}.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("BirdPage", self.lang, self.name)
 
 
     # HTML functions
@@ -0,0 +1,59 @@
+# this file contains helpers to persist intermediate build results
+# in the build cache directory and to hash their sources
+
+import hashlib
+import os
+import pickle
+
+_FILE_DIGESTS = {}
+
+def file_signature(file_names):
+    '''Summarize modification time and size of files to detect changes.
+    '''
+    signature = []
+    for file_name in sorted(file_names):
+        stat = os.stat(file_name)
+        signature.append((file_name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def load_cache(cache_file, signature):
+    '''Load cached data if it was stored for the same signature.
+
+    Returns None if there is no valid cache.
+    '''
+    if not os.path.exists(cache_file) : return None
+    try:
+        with open(cache_file, "rb") as cf:
+            cached_signature, data = pickle.load(cf)
+    except (pickle.UnpicklingError, EOFError, ValueError) : return None
+    if cached_signature != signature : return None
+    return data
+
+def save_cache(cache_file, signature, data):
+    '''Store data with the signature of its sources.
+    '''
+    parent_dir = os.path.dirname(cache_file)
+    if not os.path.exists(parent_dir) : os.makedirs(parent_dir, exist_ok=True)
+    # we write to a temporary file first, such that parallel
+    # builds never read a half written cache
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as cf:
+        pickle.dump((signature, data), cf, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    return
+
+def hash_bytes(data):
+    '''Return the hex digest of some bytes.
+    '''
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(file_name):
+    '''Return the digest of a file, it is only rehashed if it changed.
+    '''
+    try : stat = os.stat(file_name)
+    except FileNotFoundError : return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _FILE_DIGESTS.get(file_name, (None,))[0] != signature:
+        with open(file_name, "rb") as fl:
+            _FILE_DIGESTS[file_name] = (signature, hash_bytes(fl.read()))
+    return _FILE_DIGESTS[file_name][1]
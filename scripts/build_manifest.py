@@ -0,0 +1,119 @@
+# this file contains the manifest of incremental builds. while a
+# page is built, every input it reads is recorded, and the manifest
+# stores a digest of each input per page. a page only needs to be
+# rebuilt if one of its inputs changed.
+#
+# inputs are given as keys:
+#   file:<path>                 content of a file (None if it is missing)
+#   taxa:<language>:<code>      row of a bird in the taxa table
+#   placement:<language>        list of the species to place
+#   code:                       all python scripts of the build
+#   option:<name>               output option of the pages (class attribute of AbstractPage)
+
+from contextlib import contextmanager
+import glob
+import json
+import os
+
+from __init__ import INDEX_DICT
+from build_cache import file_digest, hash_bytes
+
+_RECORDED_INPUTS = None
+_TAXA_DIGESTS = {}
+
+def record_input(key):
+    '''Record that the page which is currently built reads an input.
+    '''
+    if _RECORDED_INPUTS is not None : _RECORDED_INPUTS.add(key)
+    return
+
+def record_file(file_name):
+    '''Record that the page which is currently built reads a file.
+    '''
+    record_input(f"file:{os.path.abspath(file_name)}")
+    return
+
+@contextmanager
+def recording_inputs():
+    '''Collect all inputs that are read within the context.
+    '''
+    global _RECORDED_INPUTS
+    outer_inputs = _RECORDED_INPUTS
+    _RECORDED_INPUTS = set()
+    try : yield _RECORDED_INPUTS
+    finally : _RECORDED_INPUTS = outer_inputs
+
+def taxa_digests(language):
+    '''Return the digests of all rows of the taxa table of a language.
+    '''
+    from taxa_store import TAXA_STORE
+    table = TAXA_STORE.get_table(language)
+    # the digests are renewed along with the table
+    if _TAXA_DIGESTS.get(language, (None,))[0] is not table:
+        digests = {}
+        for row in table.itertuples(index=False):
+            row_str = json.dumps(list(row), default=str)
+            digests.setdefault(row.CODE, hash_bytes(row_str.encode("utf-8")))
+        _TAXA_DIGESTS[language] = (table, digests)
+    return _TAXA_DIGESTS[language][1]
+
+def input_digest(key):
+    '''Return the current digest of an input key.
+    '''
+    kind, _, name = key.partition(":")
+    if kind == "file" : return file_digest(name)
+    if kind == "taxa":
+        language, code = name.split(":")
+        return taxa_digests(language).get(code)
+    if kind == "placement":
+        from abstract_page import get_placement_species_list
+        species = sorted(get_placement_species_list(language=name))
+        return hash_bytes("\n".join(species).encode("utf-8"))
+    if kind == "option":
+        from abstract_page import AbstractPage
+        return hash_bytes(repr(getattr(AbstractPage, name)).encode("utf-8"))
+    if kind == "code":
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        digests = [file_digest(fl) for fl in sorted(glob.glob(os.path.join(script_dir, "*.py")))]
+        return hash_bytes("".join(digests).encode("ascii"))
+    raise ValueError(f"Unknown input {key}.")
+
+class Manifest:
+    '''Digests of the inputs of each built page.
+    '''
+    def __init__(self, manifest_file=None):
+        '''Initialize from the manifest file, if there is one yet.
+        '''
+        if manifest_file is None : manifest_file = INDEX_DICT["BUILD_CACHE"]["MANIFEST"]
+        self.file = manifest_file
+        self.pages = {}
+        if os.path.exists(self.file):
+            with open(self.file, "r") as mf:
+                self.pages = json.load(mf)
+        return
+
+    def is_up_to_date(self, page_file):
+        '''Check if a page exists and none of its inputs changed since it was built.
+        '''
+        page_file = os.path.abspath(page_file)
+        if page_file not in self.pages or not os.path.exists(page_file) : return False
+        return all(input_digest(key) == digest
+                   for key, digest in self.pages[page_file].items())
+
+    def update(self, page_file, inputs):
+        '''Store the inputs of a page as dict of input keys and digests.
+        '''
+        self.pages[os.path.abspath(page_file)] = inputs
+        return
+
+    def save(self):
+        '''Write the manifest file.
+        '''
+        parent_dir = os.path.dirname(self.file)
+        if not os.path.exists(parent_dir) : os.makedirs(parent_dir, exist_ok=True)
+        tmp_file = f"{self.file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as mf:
+            json.dump(self.pages, mf, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.file)
+        return
+# end Manifest
@@ -1,10 +1,3 @@
 #!/bin/bash
-# build all pages
-python3 title_page.py
-python3 right_placement_pages.py
-python3 error_page.py
-python3 placement_pages.py
-python3 bird_pages.py 
-python3 start_placement_page.py
-python3 sequences_page.py
-python3 phylogenetics_page.py
+# build all pages, pass e.g. `-j 8` to set the number of processes
+python3 build_site.py "$@"
@@ -0,0 +1,133 @@
+# this file contains an opt-in profiler for the stages of the page
+# build. timings are summed up per stage and per page and can be
+# exported as chrome trace events (chrome://tracing, perfetto).
+
+from collections import defaultdict
+from contextlib import contextmanager
+import functools
+import json
+import os
+import threading
+import time
+
+class BuildProfiler:
+    '''Timing spans of the build stages.
+    '''
+    def __init__(self):
+        '''Initialize a disabled profiler.
+        '''
+        self.enabled = False
+        self.page = None
+        self.reset()
+        return
+
+    def reset(self):
+        '''Drop all recorded timings.
+        '''
+        self.events = []
+        # (page, stage) -> [number of calls, seconds]
+        self.totals = defaultdict(lambda: [0, 0.0])
+        return
+
+    def enable(self, enabled=True):
+        '''Switch the profiler on or off.
+        '''
+        self.enabled = enabled
+        return
+
+    @contextmanager
+    def span(self, stage, trace=True):
+        '''Time the code within the context as a stage.
+
+        Stages that are called very often (e.g. per line) should not be
+        traced, they only show up in the totals.
+        '''
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try : yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            total = self.totals[(self.page, stage)]
+            total[0] += 1
+            total[1] += duration / 1e9
+            if trace:
+                self.events.append({
+                    "name": stage, "cat": "build", "ph": "X",
+                    "ts": start / 1e3, "dur": duration / 1e3,
+                    "pid": os.getpid(), "tid": threading.get_ident(),
+                    "args": {"page": self.page}})
+
+    def profiled(self, stage, trace=True):
+        '''Decorate a function, such that each call is timed as a stage.
+        '''
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled : return function(*args, **kwargs)
+                with self.span(stage, trace=trace):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def collect(self):
+        '''Return all timings (e.g. to send them from a worker process) and reset.
+        '''
+        timings = (self.events, [(key, value) for key, value in self.totals.items()])
+        self.reset()
+        return timings
+
+    def merge(self, timings):
+        '''Add timings that were collected by another profiler.
+        '''
+        events, totals = timings
+        self.events.extend(events)
+        for (page, stage), (calls, seconds) in totals:
+            total = self.totals[(page, stage)]
+            total[0] += calls
+            total[1] += seconds
+        return
+
+    def stage_totals(self):
+        '''Sum up calls and seconds per stage over all pages.
+        '''
+        stages = defaultdict(lambda: [0, 0.0])
+        for (_, stage), (calls, seconds) in self.totals.items():
+            stages[stage][0] += calls
+            stages[stage][1] += seconds
+        return dict(stages)
+
+    def page_totals(self, stage="page"):
+        '''Return the seconds of a stage per page.
+        '''
+        return {page: seconds for (page, st), (_, seconds) in self.totals.items()
+                if st == stage}
+
+    def report(self, slowest_pages=10):
+        '''Summarize the timings in a printable table.
+
+        Stages are nested, so the time of a stage includes its inner stages.
+        '''
+        lines = [f"{'stage':<24}{'calls':>8}{'seconds':>10}"]
+        for stage, (calls, seconds) in sorted(
+                self.stage_totals().items(), key=lambda item: -item[1][1]):
+            lines.append(f"{stage:<24}{calls:>8}{seconds:>10.2f}")
+        pages = sorted(self.page_totals().items(), key=lambda item: -item[1])
+        if pages:
+            lines.append("")
+            lines.append(f"{'slowest pages':<44}{'seconds':>10}")
+            for page, seconds in pages[:slowest_pages]:
+                lines.append(f"{page:<44}{seconds:>10.2f}")
+        return "\n".join(lines)
+
+    def save_trace(self, trace_file):
+        '''Write all traced spans as chrome trace event json.
+        '''
+        with open(trace_file, "w") as tf:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, tf)
+        return
+# end BuildProfiler
+
+# the profiler every stage of this process reports to
+PROFILER = BuildProfiler()
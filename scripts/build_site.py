@@ -0,0 +1,179 @@
+# this script builds all pages of the website in parallel.
+# each page of a given page type, language and species is
+# one job of a process pool.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import importlib
+import os
+import sys
+import time
+import traceback
+
+from __init__ import INDEX_DICT
+from abstract_page import AbstractPage, get_placement_species_list
+from build_manifest import input_digest, Manifest, record_file, record_input, recording_inputs
+from build_profiler import PROFILER
+from routes import ROUTES
+from text_catalog import get_languages
+
+INDEX_FILE = "../index.json"
+
+# page types as (module, class, species the pages are built for)
+PAGE_TYPES = [
+    ("title_page", "TitlePage", None),
+    ("right_placement_pages", "RightPlacementPage", "placement"),
+    ("error_page", "ErrorPage", None),
+    ("placement_pages", "PlacementPage", "placement"),
+    ("bird_pages", "BirdPage", "names"),
+    ("start_placement_page", "StartPlacementPage", None),
+    ("sequences_page", "SequencesPage", None),
+    ("phylogenetics_page", "PhylogeneticsPage", None),
+]
+
+def get_bird_names(language="EN"):
+    '''Return all bird names that get their own page.
+    '''
+    names_file = INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_NAMES"]
+    with open(names_file, "r") as nf:
+        return [name.strip() for name in nf if name.strip()]
+
+def enumerate_jobs(page_types=PAGE_TYPES, languages=None):
+    '''List all pages to build as (module, class, language, bird name).
+    '''
+    if languages is None : languages = get_languages()
+    jobs = []
+    for module_name, class_name, species in page_types:
+        for lang in languages:
+            if species is None:
+                jobs.append((module_name, class_name, lang, None))
+                continue
+            if species == "names" : bird_names = get_bird_names(language=lang)
+            else : bird_names = get_placement_species_list(language=lang)
+            jobs.extend((module_name, class_name, lang, bird_name) for bird_name in bird_names)
+    return jobs
+
+_MANIFEST = None
+
+def get_manifest():
+    '''Return the manifest of the last build, it is loaded once per process.
+    '''
+    global _MANIFEST
+    if _MANIFEST is None : _MANIFEST = Manifest()
+    return _MANIFEST
+
+def build_page(job, incremental=False):
+    '''Build and save a single page.
+
+    With `incremental`, pages whose inputs did not change are skipped.
+    Returns the error message (None on success), the path of the page,
+    the digests of its inputs (None if the page was skipped) and the
+    timings of the profiler (None if it is disabled).
+    '''
+    module_name, class_name, language, bird_name = job
+    error = page_file = digests = None
+    PROFILER.page = format_job(job)
+    try:
+        with PROFILER.span("page"), recording_inputs() as inputs:
+            # every page depends on the build code and on the paths of all pages
+            record_input("code:")
+            record_file(INDEX_FILE)
+            page_class = getattr(importlib.import_module(module_name), class_name)
+            with PROFILER.span("init_page"):
+                if bird_name is None : page = page_class(language=language)
+                else : page = page_class(bird_name, language=language)
+            page_file = page.make_page_path()
+            if not incremental or not get_manifest().is_up_to_date(page_file):
+                page.build_html()
+                page.save_html(force=True)
+                digests = {key: input_digest(key) for key in inputs}
+    except Exception:
+        error = traceback.format_exc()
+    PROFILER.page = None
+    timings = PROFILER.collect() if PROFILER.enabled else None
+    return error, page_file, digests, timings
+
+def init_worker(profile=False, external_svgs=False, routes=None):
+    '''Prepare a worker process of the pool.
+    '''
+    PROFILER.enable(profile)
+    AbstractPage.EXTERNAL_SVGS = external_svgs
+    if routes is not None : ROUTES.update(routes)
+    return
+
+def build_site(jobs=None, processes=None, incremental=True, profile=False,
+               external_svgs=False):
+    '''Build all pages on a pool of processes.
+
+    With `incremental`, only pages whose inputs changed since the last
+    build are rebuilt. Failing pages are reported, but do not stop the
+    build of the others. With `profile`, the timings of all workers are
+    gathered in the PROFILER of this process. With `external_svgs`, the
+    trees are written as shared svg files instead of being pasted into
+    each page.
+    Returns the failed jobs with their error messages.
+    '''
+    if jobs is None : jobs = enumerate_jobs()
+    # the routes of all pages are resolved once and shared with all workers
+    routes = ROUTES.build(enumerate_jobs())
+    manifest = get_manifest()
+    failures = {}
+    skipped = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=(profile, external_svgs, routes)) as pool:
+        futures = {pool.submit(build_page, job, incremental): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try : error, page_file, digests, timings = future.result()
+            except Exception : error, page_file, digests, timings = traceback.format_exc(), None, None, None
+            if timings is not None : PROFILER.merge(timings)
+            if error is not None:
+                failures[job] = error
+                print(f"Failed to build {format_job(job)}:\n{error}", file=sys.stderr)
+            elif digests is None : skipped += 1
+            else : manifest.update(page_file, digests)
+    manifest.save()
+    seconds = time.perf_counter() - start
+    built = len(jobs) - len(failures) - skipped
+    print(f"Built {built} of {len(jobs)} pages ({skipped} up to date) in {seconds:.1f} s.")
+    return failures
+
+def format_job(job):
+    '''Describe a job in a short string.
+    '''
+    _, class_name, language, bird_name = job
+    if bird_name is None : return f"{class_name} ({language})"
+    return f"{class_name} ({language}, {bird_name})"
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Build all pages of the website.")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count(),
+            help="number of processes that build pages in parallel")
+    parser.add_argument("-l", "--languages", nargs="+", default=None,
+            help="only build pages of these languages")
+    parser.add_argument("-f", "--force", action="store_true",
+            help="rebuild all pages, even if their inputs did not change")
+    parser.add_argument("-e", "--external-svgs", action="store_true",
+            help="write the trees as shared svg files instead of pasting them into the pages")
+    parser.add_argument("-p", "--profile", action="store_true",
+            help="report the time spent per build stage and page")
+    parser.add_argument("-t", "--trace", default=None,
+            help="write the profiled stages to this chrome trace event json file")
+    args = parser.parse_args()
+
+    profile = args.profile or args.trace is not None
+    failures = build_site(
+            jobs=enumerate_jobs(languages=args.languages),
+            processes=args.processes,
+            incremental=not args.force,
+            profile=profile,
+            external_svgs=args.external_svgs)
+    if profile : print(PROFILER.report())
+    if args.trace is not None : PROFILER.save_trace(args.trace)
+    if failures : sys.exit(1)
+    return
+
+if __name__ == "__main__":
+    main()
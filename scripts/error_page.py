@@ -5,10 +5,11 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
 from __init__ import INDEX_DICT
+from routes import ROUTES
+from text_catalog import TEXT_CATALOG
 
 class ErrorPage(AbstractPage):
     '''Builder class for an error page.
@@ -17,8 +18,7 @@ class ErrorPage(AbstractPage):
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "error_page.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "error_page")
 
         # this can be edited.
         # so far we take a simple title.
@@ -28,10 +28,7 @@ class ErrorPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["START_AND_ERROR_HTML_DIR"],
-                "error_page.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("ErrorPage", self.lang)
 
 
     # HTML functions
@@ -0,0 +1,63 @@
+# this file contains the streaming serialization of dominate
+# documents. large raw blocks (sequences, svgs) are only left as
+# placeholders in the document while it is written, so it is rendered
+# through the public api of dominate without them. the blocks are
+# produced by their sources and go to the file at their placeholders in
+# chunks. any other render of the document contains the blocks in place.
+
+import regex as re
+
+from dominate.util import text
+
+# placeholders contain nul characters, which never occur in html
+PLACEHOLDER = "\x00raw-stream-{}\x00"
+PLACEHOLDER_RE = re.compile("\x00raw-stream-([0-9]+)\x00")
+# raw streams only render as placeholders while a document is written
+_WRITING = False
+
+class RawStream(text):
+    '''Raw html of a source that is only read when the document is rendered.
+
+    `chunks` is a function that returns an iterable of strings. It is
+    called every time the document is rendered. It has to be given as
+    keyword, dominate takes a single function argument as decorator.
+    '''
+    def __init__(self, chunks):
+        '''Initialize with the function that produces the html.
+        '''
+        super().__init__("", escape=False)
+        self.chunks = chunks
+        return
+
+    @property
+    def text(self):
+        '''The html of the source, or its placeholder while the document is written.
+        '''
+        if _WRITING : return PLACEHOLDER.format(id(self))
+        return "".join(self.chunks())
+
+    @text.setter
+    def text(self, value):
+        '''Ignore the text dominate sets, the html always comes from the source.
+        '''
+        return
+# end RawStream
+
+# helpers
+def write_document(doc, out_file, indent="  ", pretty=True, xhtml=False):
+    '''Write a dominate document into an open text file.
+
+    The output is the same as `str(doc)`, but the html of the raw
+    streams is written chunk by chunk instead of joined into the string.
+    '''
+    global _WRITING
+    streams = {str(id(stream)): stream for stream in doc.get(RawStream)}
+    _WRITING = True
+    try : parts = PLACEHOLDER_RE.split(doc.render(indent=indent, pretty=pretty, xhtml=xhtml))
+    finally : _WRITING = False
+    # the parts alternate between html of the document and ids of streams
+    for i, part in enumerate(parts):
+        if i % 2 == 0 : out_file.write(part)
+        else:
+            for chunk in streams[part].chunks() : out_file.write(chunk)
+    return
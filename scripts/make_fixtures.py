@@ -0,0 +1,235 @@
+# this script generates synthetic websites with a given number of
+# species to benchmark the page build at larger scales. a fixture has
+# the same layout as the repository and its own index.json with
+# absolute paths.
+
+import argparse
+import copy
+import csv
+import json
+import os
+import random
+import shutil
+import string
+
+from __init__ import INDEX_DICT
+from sequence_store import save_packed_sequence
+from text_catalog import get_languages
+
+# the example bird of the sequences page has to exist in every fixture
+EXAMPLE_BIRD = "PELCR"
+WORDS = ["forest", "coast", "island", "wetland", "mountain", "desert", "grain",
+         "insects", "fish", "seeds", "berries", "small", "large", "migrating",
+         "nests", "sings", "colorful", "brown", "ground", "river"]
+
+class FixtureSite:
+    '''Builder of a synthetic website with a given number of species.
+    '''
+    def __init__(self, root_dir, species_count, placement_count=8,
+                 sequence_length=32190, seed=42):
+        '''Initialize with the directory of the fixture and its size.
+        '''
+        self.root = os.path.abspath(root_dir)
+        self.count = species_count
+        self.placement_count = min(placement_count, species_count)
+        self.sequence_length = sequence_length
+        self.random = random.Random(seed)
+        self.codes = make_codes(species_count)
+        self.index = make_index(self.root)
+        return
+
+    def make(self):
+        '''Write all files of the fixture.
+        '''
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "index.json"), "w") as index_file:
+            json.dump(self.index, index_file, indent=4)
+        for lang in get_languages(self.index):
+            self.make_texts(lang)
+            self.make_trees(lang)
+        self.make_names()
+        self.make_sequences()
+        self.copy_css()
+        return self.index
+
+    def paths(self, language="EN"):
+        '''Return the paths of a language.
+        '''
+        return self.index[language]["PATHS_FROM_SCRIPTS"]
+
+    def make_texts(self, language):
+        '''Copy the yml texts and write a synthetic taxa table.
+        '''
+        text_dir = self.paths(language)["BIRD_TEXTS"]
+        os.makedirs(text_dir, exist_ok=True)
+        source_dir = INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"]
+        for fl in os.listdir(source_dir):
+            if fl.endswith(".yml") : shutil.copy(os.path.join(source_dir, fl), text_dir)
+
+        with open(INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_INFO"], "r") as source:
+            header = source.readline().rstrip("\n").split(";")
+        with open(self.paths(language)["BIRD_INFO"], "w", newline="") as taxa_file:
+            writer = csv.writer(taxa_file, delimiter=";")
+            writer.writerow(header)
+            for code in self.codes:
+                row = {column: self.make_words(3) for column in header}
+                row["CODE"] = code
+                row["Name"] = f"{self.make_words(1).capitalize()} {code.lower()}"
+                row["Latin"] = f"{code[:3].capitalize()}us {code[3:].lower()}ensis"
+                row["text"] = self.make_words(40)
+                writer.writerow([row[column] for column in header])
+        return
+
+    def make_words(self, count):
+        '''Make a random text with a given number of words.
+        '''
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def make_names(self):
+        '''Write the list of all species.
+        '''
+        with open(self.paths()["BIRD_NAMES"], "w") as names_file:
+            names_file.write("\n".join(self.codes) + "\n")
+        return
+
+    def make_trees(self, language):
+        '''Write a genesis style tree svg and the placement svgs of a language.
+        '''
+        tree_dir = self.paths(language)["BIRD_PLACEMENT_IMG_DIR"]
+        os.makedirs(tree_dir, exist_ok=True)
+        with open(os.path.join(tree_dir, "tree.svg"), "w") as svg_file:
+            svg_file.write(make_tree_svg(self.codes, language))
+        for code in self.codes[:self.placement_count]:
+            for kind in ["question", "answer"]:
+                svg_path = os.path.join(tree_dir, f"tree_{code}_{kind}.svg")
+                with open(svg_path, "w") as svg_file:
+                    svg_file.write(make_tree_svg(self.codes, language, placement=(code, kind)))
+        return
+
+    def make_sequences(self):
+        '''Write the list of short fragments and a packed long sequence per species.
+        '''
+        seq_dir = self.paths()["SEQUENCES"]
+        os.makedirs(seq_dir, exist_ok=True)
+        list_lines = ["<!DOCTYPE html>", "<html>", "<head>",
+                      '    <link rel="stylesheet" href="styles.css">',
+                      "</head>", "<body>", "<dl>"]
+        for code in self.codes:
+            fragment = "".join(
+                    f'<span class="nt{char.lower()}">{char}</span>'
+                    for char in self.random.choices("ACGT", k=10))
+            list_lines.append(f'<dt>{code}</dt><dd><span class="sequence">{fragment}</span></dd>')
+            save_packed_sequence(self.make_long_sequence(), os.path.join(seq_dir, f"{code}.nt2"))
+        list_lines.extend(["</dl>", "", "</body>", "</html>", ""])
+        with open(os.path.join(seq_dir, "list.html"), "w") as list_file:
+            list_file.write("\n".join(list_lines))
+        return
+
+    def make_long_sequence(self):
+        '''Make a random long sequence with a leading and a trailing gap.
+        '''
+        gap = "-" * (self.sequence_length // 10)
+        nucleotides = self.random.choices("ACGT", k=self.sequence_length - 2 * len(gap))
+        return gap + "".join(nucleotides) + gap
+
+    def copy_css(self):
+        '''Copy the style sheets.
+        '''
+        shutil.copy(
+                os.path.join(INDEX_DICT["EN"]["PATHS_FROM_SCRIPTS"]["SEQUENCES"], "styles.css"),
+                self.paths()["SEQUENCES"])
+        css_dir = self.paths()["CSS_DIR"]
+        os.makedirs(css_dir, exist_ok=True)
+        shutil.copy(
+                os.path.join(INDEX_DICT["EN"]["PATHS_FROM_SCRIPTS"]["CSS_DIR"], "two_columns.css"),
+                css_dir)
+        return
+# end FixtureSite
+
+# helpers
+def make_codes(count):
+    '''Make unique 5 letter codes of species.
+    '''
+    codes = [EXAMPLE_BIRD]
+    i = 0
+    while len(codes) < count:
+        code = ""
+        number = i
+        for _ in range(5):
+            number, letter = divmod(number, 26)
+            code = string.ascii_uppercase[letter] + code
+        if code != EXAMPLE_BIRD : codes.append(code)
+        i += 1
+    return codes[:count]
+
+def make_index(root_dir):
+    '''Copy the index with all relative paths moved into the fixture directory.
+    '''
+    def move(value):
+        if isinstance(value, dict) : return {k: move(v) for k, v in value.items()}
+        if isinstance(value, str) and value.startswith("../"):
+            return os.path.join(root_dir, value[len("../"):])
+        return value
+    return move(copy.deepcopy(INDEX_DICT))
+
+def make_tree_svg(codes, language, placement=None, step=90):
+    '''Make a genesis style svg of a caterpillar tree with one image per species.
+
+    `placement` is a tuple of the species to place and "question" or "answer".
+    '''
+    height = step*len(codes) + 100
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="665" height="{height}" style="background:#ffffffff">',
+        '<!-- Synthetic fixture in the style of genesis (http://genesis-lib.org) -->',
+        '    <g transform="translate( 20, 70)" >',
+        '        <g>']
+    for i in range(len(codes)):
+        y = step*i
+        lines.append(
+            f'            <line x1="{i}" y1="{y}" x2="500" y2="{y}" stroke="#000000" '
+            'stroke-opacity="1" stroke-width="6" stroke-linecap="round" />')
+    lines.extend(['        </g>', '        <g>'])
+    for i, code in enumerate(codes):
+        y = step*i
+        if placement is not None and placement == (code, "question"):
+            continue
+        lines.extend([
+            f'            <a target="_blank" href="../../../public/{language.lower()}/species/{code}.html">',
+            f'                <g transform="translate( 500, {y} )">'])
+        if placement is not None and placement == (code, "answer"):
+            lines.extend([
+                '                    <g>',
+                f'                        <image x="10" y="-50" width="80" height="80" xlink:href="../../thumbs/{code}.png" />',
+                '                        <rect x="10" y="-50" width="80" height="80" stroke="#cc2d47" '
+                'stroke-opacity="1" stroke-width="6" fill="none" />',
+                '                    </g>'])
+        else:
+            lines.append(
+                f'                    <image x="10" y="-50" width="80" height="80" xlink:href="../../thumbs/{code}.png" />')
+        lines.extend(['                </g>', '            </a>'])
+    if placement is not None and placement[1] == "question":
+        y = step*codes.index(placement[0])
+        lines.extend([
+            f'            <g transform="translate( 500, {y} )">',
+            '                <image x="10" y="-50" width="80" height="80" xlink:href="../../question.png" />',
+            '            </g>'])
+    lines.extend(['        </g>', '    </g>', '</svg>', ''])
+    return "\n".join(lines)
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic website fixture.")
+    parser.add_argument("species_count", type=int, help="number of species")
+    parser.add_argument("fixture_dir", help="directory to write the fixture to")
+    parser.add_argument("--placements", type=int, default=8,
+            help="number of species to place")
+    args = parser.parse_args()
+
+    FixtureSite(args.fixture_dir, args.species_count, placement_count=args.placements).make()
+    print(f"Fixture with {args.species_count} species was written to {args.fixture_dir}.")
+    return
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,132 @@
-# simple script to scale images to thumbs
+# simple script to scale images to thumbs.
+# images are processed in parallel and all sizes of an image are
+# made from a single decode. thumbs are only made again if their
+# image changed (see `is_up_to_date`).
 
-from napari_utils import rescale_to_square
-from __init__ import INDEX_DICT
-from skimage import io
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
 import os
+import sys
+import time
+import traceback
+
+from __init__ import INDEX_DICT
+from build_cache import file_digest
+
+# size of the thumbs that are shown in the trees
+THUMB_SIZE = 100
+
+def get_images(img_dir):
+    '''List all cropped images of birds.
+    '''
+    return sorted(img for img in os.listdir(img_dir) if
+            img.endswith(".png") and not img.endswith("_raw.png"))
+
+def make_thumb_dirs(sizes, thumbs_dir=None):
+    '''Map each size to its output directory.
+
+    Thumbs of the default size go to the thumbs directory of the trees,
+    other sizes to a sibling directory with the size as suffix.
+    '''
+    if thumbs_dir is None : thumbs_dir = INDEX_DICT["EN"]["PATHS_FROM_SCRIPTS"]["BIRD_TREE_IMG_DIR"]
+    return {size: thumbs_dir if size == THUMB_SIZE else f"{thumbs_dir}_{size}"
+            for size in sizes}
+
+def load_hashes(hash_file=None):
+    '''Load the hashes of the images the thumbs were made from.
+    '''
+    if hash_file is None : hash_file = INDEX_DICT["BUILD_CACHE"]["THUMBS"]
+    if not os.path.exists(hash_file) : return {}
+    with open(hash_file, "r") as hf:
+        return json.load(hf)
+
+def save_hashes(hashes, hash_file=None):
+    '''Store the hashes of the images the thumbs were made from.
+    '''
+    if hash_file is None : hash_file = INDEX_DICT["BUILD_CACHE"]["THUMBS"]
+    os.makedirs(os.path.dirname(hash_file), exist_ok=True)
+    tmp_file = f"{hash_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as hf:
+        json.dump(hashes, hf, indent=1, sort_keys=True)
+    os.replace(tmp_file, hash_file)
+    return
 
+def is_up_to_date(in_path, out_path, hashes):
+    '''Check if a thumb exists and is newer than its image or was made from the same image.
+    '''
+    if not os.path.exists(out_path) : return False
+    if os.path.getmtime(out_path) >= os.path.getmtime(in_path) : return True
+    # e.g. the image was copied or touched without changing it
+    return hashes.get(os.path.abspath(out_path)) == file_digest(in_path)
+
+def make_thumbs(in_path, out_paths):
+    '''Decode an image once and save a thumb for each size.
+
+    `out_paths` maps each size to the file of its thumb. Returns the
+    error message (None on success), the number of decoded bytes
+    and the hash of the image.
+    '''
+    try:
+        from napari_utils import rescale_to_square
+        from skimage import io
+        image = io.imread(in_path)
+        for size, out_path in out_paths.items():
+            io.imsave(out_path, rescale_to_square(image, square_pixel_size=size))
+    except Exception:
+        return traceback.format_exc(), 0, None
+    return None, image.nbytes, file_digest(in_path)
+
+###############
 def main():
+    parser = argparse.ArgumentParser(description="Scale the cropped bird images to thumbs.")
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=[THUMB_SIZE],
+            help="edge lengths of the thumbs in pixels")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count(),
+            help="number of processes that make thumbs in parallel")
+    parser.add_argument("-f", "--force", action="store_true",
+            help="make all thumbs, even if their images did not change")
+    args = parser.parse_args()
+
     img_dir = INDEX_DICT["EN"]["PATHS_FROM_SCRIPTS"]["BIRD_PAGE_IMG_DIR"]
-    thumbs_dir = INDEX_DICT["EN"]["PATHS_FROM_SCRIPTS"]["BIRD_TREE_IMG_DIR"]
+    thumb_dirs = make_thumb_dirs(args.sizes)
+    for thumb_dir in thumb_dirs.values() : os.makedirs(thumb_dir, exist_ok=True)
+    hashes = load_hashes()
 
-    all_images = [img for img in os.listdir(img_dir) if 
-            img.endswith(".png") and not img.endswith("_raw.png")]
-    for image_name in all_images:
+    # only images with at least one missing or outdated thumb are decoded
+    jobs = {}
+    image_names = get_images(img_dir)
+    for image_name in image_names:
         in_path = os.path.join(img_dir, image_name)
-        out_path = os.path.join(thumbs_dir, image_name)
-        
-        # load and rescale image
-        image = io.imread(in_path)
-        resc_image = rescale_to_square(image, square_pixel_size=100)
-        
-        # store it
-        io.imsave(out_path, resc_image)
-        print(out_path, " was saved")
+        out_paths = {size: os.path.join(thumb_dir, image_name) for size, thumb_dir in thumb_dirs.items()}
+        if args.force or not all(is_up_to_date(in_path, out_path, hashes) for out_path in out_paths.values()):
+            jobs[in_path] = out_paths
+    skipped = len(image_names) - len(jobs)
+
+    start = time.perf_counter()
+    failed = 0
+    decoded_bytes = 0
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = {pool.submit(make_thumbs, in_path, out_paths): in_path
+                   for in_path, out_paths in jobs.items()}
+        for future in as_completed(futures):
+            in_path = futures[future]
+            error, nbytes, digest = future.result()
+            if error is not None:
+                failed += 1
+                print(f"Failed to make thumbs of {in_path}:\n{error}", file=sys.stderr)
+                continue
+            decoded_bytes += nbytes
+            for out_path in jobs[in_path].values():
+                hashes[os.path.abspath(out_path)] = digest
+                print(out_path, " was saved")
+    save_hashes(hashes)
+
+    seconds = time.perf_counter() - start
+    made = len(jobs) - failed
+    print(f"Made thumbs of {made} images ({skipped} up to date, {failed} failed) in {seconds:.1f} s, "
+          f"{made / max(seconds, 1e-9):.1f} images/s, {decoded_bytes / 1e6 / max(seconds, 1e-9):.1f} MB/s decoded.")
+    return
 
 if __name__ == "__main__":
     main()
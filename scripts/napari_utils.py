@@ -1,16 +1,35 @@
 # this file contains classes and methods that support the napari
-# cropping
+# cropping. napari itself is only needed by the caller that opens
+# the viewer, so the crops can also be replayed headless.
 
+import argparse
+import ast
+from concurrent.futures import ThreadPoolExecutor
 import csv
-import napari
+import json
 import numpy as np
 import os
+import shutil
 from skimage import io
+import traceback
+
+from __init__ import INDEX_DICT
+from build_cache import hash_bytes
+
+# longer side of the smallest level of the image pyramids in pixels
+PYRAMID_MIN_SIZE = 1024
+PYRAMID_KEY_FILE = "key.json"
+# shorter side of the copy of an image that crop suggestions are scored on
+SALIENCY_SIZE = 256
 
 
 class NapariIMG:
-    def __init__(self, image_name, viewer, output_dir=None):
+    def __init__(self, image_name, viewer, output_dir=None, pixels=None, multiscale=False):
         '''Initialize from bird image name and a given napari viewer.
+
+        The image is read from its file unless its pixels are given. With
+        `multiscale` it is shown as image pyramid (see `load_pyramid`),
+        given pixels are then the levels of the pyramid.
         '''
         # make alias for bird name and store file and output paths
         self.alias = make_alias(image_name)
@@ -20,13 +39,17 @@ class NapariIMG:
         # store the viewer
         self.viewer = viewer
         
-        # the image is loaded
-        img_handle = io.imread(image_name)
-        self.image = self.viewer.add_image(img_handle,
+        # the image is loaded once, the viewer and the cropper share its pixels
+        if pixels is None and multiscale : pixels = load_pyramid(image_name)
+        elif pixels is None : pixels = io.imread(image_name)
+        # napari places all levels in the coordinates of the full resolution,
+        # so the cropping square always refers to the first level
+        self.pixels = pixels[0] if multiscale else pixels
+        self.image = self.viewer.add_image(pixels, multiscale=multiscale,
                                            name=image_name.split("/")[-1].split(".")[0])
         
         # we check how it is oriented because then we only crop along the longer axis
-        img_dims = self.image.data.shape
+        img_dims = self.pixels.shape
         self.max_square_length = min(img_dims[0], img_dims[1])
         if img_dims[0] == img_dims[1] : self.orientation = "square"
         elif img_dims[0] < img_dims[1] : self.orientation = "horizontal"
@@ -34,11 +57,18 @@ class NapariIMG:
         
         return
         
-    def add_square(self):
+    def add_square(self, suggest=False):
         '''Add a square of maximal possible size for cropping.
+
+        It starts at the origin, or with `suggest` where the image has
+        the most edges (see `suggest_croposition`).
         '''
+        if suggest:
+            suggested_bounds = suggest_croposition(self.pixels)
+            corners = [suggested_bounds[0], suggested_bounds[2]]
+        else : corners = [[0, 0], [self.max_square_length, self.max_square_length]]
         self.square = self.viewer.add_shapes(
-            [[0, 0], [self.max_square_length, self.max_square_length]],
+            corners,
             shape_type='rectangle',
             opacity=.3,
             edge_width=1,
@@ -50,15 +80,9 @@ class NapariIMG:
         '''
         assert hasattr(self, "square"), "You do not have any cropping square!"
         optimal_bounds = get_optimal_croposition(self.square.data[0],
-                                                 self.image.data.shape,
+                                                 self.pixels.shape,
                                                  orientation=self.orientation)
-        self.crop_dict = {
-                "top_left": coordinatearray_to_dict(optimal_bounds[0]),
-                "top_right": coordinatearray_to_dict(optimal_bounds[1]),
-                "bottom_right": coordinatearray_to_dict(optimal_bounds[2]),
-                "bottom_left": coordinatearray_to_dict(optimal_bounds[3]),
-                "source_file": self.file
-            }
+        self.crop_dict = make_crop_dict(optimal_bounds, self.file)
         if self.outdir is not None:
             if not hasattr(self, "outfile") : self.make_outfile_name()
             self.crop_dict["cropped_file"] = self.outfile
@@ -87,11 +111,17 @@ class NapariIMG:
             face_color="red")
         return
     
+    def get_cropper(self):
+        '''Return the cropper of the image, it reuses the loaded pixels instead of reading the file again.
+        '''
+        if not hasattr(self, "cropper") : self.cropper = ImageCropper(self.file, image=self.pixels)
+        return self.cropper
+
     def crop_square(self):
         '''Crop the raw image down to the square.
         '''
         assert hasattr(self, "opti_square"), "Optimized cropping square was not loaded before."
-        cropper = ImageCropper(self.file)
+        cropper = self.get_cropper()
         self.cropped_image = cropper.crop(
             self.crop_dict["top_left"]["x"], self.crop_dict["bottom_right"]["x"],
             self.crop_dict["top_left"]["y"], self.crop_dict["bottom_right"]["y"])
@@ -108,7 +138,7 @@ class NapariIMG:
         
         self.make_outfile_name(output_dir=output_dir)
         
-        cropper = ImageCropper(self.file)
+        cropper = self.get_cropper()
         cropper.crop_resize_save(
             self.crop_dict["top_left"]["x"], self.crop_dict["bottom_right"]["x"],
             self.crop_dict["top_left"]["y"], self.crop_dict["bottom_right"]["y"],
@@ -125,16 +155,20 @@ class NapariIMG:
 class ImageCropper:
     '''This class supports to crop an image, rescale it and save the processed data.
     '''
-    def __init__(self, image_filename):
-        '''Initialize from image file.
+    def __init__(self, image_filename, image=None):
+        '''Initialize from image file, or from its pixels if they were loaded before.
         '''
         assert os.path.exists(image_filename), f"Image {image_filename} does not exist."
-        self.image = io.imread(image_filename)
+        if image is None : image = io.imread(image_filename)
+        self.image = image
         return
     
     
     def crop(self, x_min, x_max, y_min, y_max):
         '''Crop image applying a given rectangular frame.
+
+        The crop is a view of the loaded image, its pixels are only
+        copied when it is resized.
         '''
         self.cropped_image = self.image[
             x_min : x_max, y_min : y_max]
@@ -144,8 +178,7 @@ class ImageCropper:
     def save(self, output_filename, force=False):
         '''Save cropped image.
         '''
-        from skimage import color
-        if os.path.exists(output_filename) or force : return
+        if os.path.exists(output_filename) and not force : return
         assert hasattr(self, "cropped_image")
         
         io.imsave(output_filename, self.cropped_image)
@@ -182,6 +215,116 @@ class ImageCropper:
         return
 # end ImageCropper
 
+class CroppingSession:
+    '''This class supports to crop a batch of images one after the other.
+
+    The next images are decoded on a background thread while the current
+    one is cropped, and the crops are resized and saved on other threads.
+    The cropping area of an image is only tracked once its crop is saved.
+    '''
+    def __init__(self, image_names=None, output_dir=None, prefetch=3, save_threads=2,
+                 rescaling_function=None, force=False, cropping_csv_file_name=None,
+                 multiscale=False):
+        '''Initialize from the images to crop, by default all source images.
+
+        Crops are rescaled with `rescale_to_square_box` by default, it
+        needs far less memory per save thread than `rescale_to_square`.
+        '''
+        if image_names is None : image_names = get_source_images()
+        if rescaling_function is None : rescaling_function = rescale_to_square_box
+        self.image_names = list(image_names)
+        self.outdir = output_dir
+        self.prefetch = prefetch
+        self.rescaling_function = rescaling_function
+        self.force = force
+        self.cropping_csv_file_name = cropping_csv_file_name
+        self.multiscale = multiscale
+        self.cropping_dict = {}
+
+        # images are decoded in order on a single thread, so the next one is ready first
+        self.loader = ThreadPoolExecutor(max_workers=1)
+        self.saver = ThreadPoolExecutor(max_workers=save_threads)
+        # index of image -> future of its pixels
+        self.loading = {}
+        # output file -> (alias, cropping area, future of its saved crop), aliases
+        # of different birds can collide but two crops never write one file at once
+        self.saving = {}
+        # source image -> error of the crops that failed since the last wait
+        self.failures = {}
+        return
+
+    def __len__(self):
+        '''Number of images of the session.
+        '''
+        return len(self.image_names)
+
+    def open_image(self, index, viewer):
+        '''Show an image in a viewer, it was usually decoded while the previous one was cropped.
+        '''
+        # images that were skipped are not decoded anymore
+        for i in [i for i in self.loading.keys() if i < index] : self.loading.pop(i).cancel()
+        last = min(index + self.prefetch, len(self.image_names) - 1)
+        load_function = load_pyramid if self.multiscale else io.imread
+        for i in range(index, last + 1):
+            if i not in self.loading:
+                self.loading[i] = self.loader.submit(load_function, self.image_names[i])
+        pixels = self.loading.pop(index).result()
+        return NapariIMG(self.image_names[index], viewer, output_dir=self.outdir,
+                         pixels=pixels, multiscale=self.multiscale)
+
+    def save(self, nimg):
+        '''Save the crop of an image in the background.
+
+        A pending save to the same output file is waited for first.
+        '''
+        nimg.make_outfile_name()
+        if nimg.outfile in self.saving : self.collect(wait=True, outfiles=[nimg.outfile])
+        self.saving[nimg.outfile] = (nimg.alias, nimg.crop_dict, self.saver.submit(
+            nimg.save_cropped, rescaling_function=self.rescaling_function, force=self.force))
+        self.collect()
+        return
+
+    def collect(self, wait=False, outfiles=None):
+        '''Track the cropping areas of the saved crops and the errors of the failed ones.
+
+        The index is only written here on the calling thread, so its rows
+        never interleave, and failed crops never get a row. With `outfiles`
+        only the crops of these output files are tracked.
+        '''
+        if outfiles is None : outfiles = list(self.saving.keys())
+        for outfile in outfiles:
+            alias, crop_dict, future = self.saving[outfile]
+            if not wait and not future.done() : continue
+            del self.saving[outfile]
+            error = future.exception()
+            if error is not None:
+                self.failures[crop_dict["source_file"]] = "".join(traceback.format_exception(
+                    type(error), error, error.__traceback__))
+                continue
+            self.cropping_dict[alias] = crop_dict
+            if self.cropping_csv_file_name is not None:
+                save_cropping_areas({alias: crop_dict}, self.cropping_csv_file_name, append=True)
+        return
+
+    def wait(self):
+        '''Wait until all crops are saved, returns the errors of the failed ones by source image.
+        '''
+        self.collect(wait=True)
+        failures = self.failures
+        self.failures = {}
+        return failures
+
+    def close(self):
+        '''Wait for all crops and stop the background threads.
+        '''
+        failures = self.wait()
+        for future in self.loading.values() : future.cancel()
+        self.loading = {}
+        self.loader.shutdown()
+        self.saver.shutdown()
+        return failures
+# end CroppingSession
+
     
 # helpers NapariIMG
 def make_alias(bird_image_filepath):
@@ -200,6 +343,17 @@ def coordinatearray_to_dict(coord_in_array):
     '''
     return {"x": int(coord_in_array[0]), "y": int(coord_in_array[1])}
 
+def make_crop_dict(bounds, source_file):
+    '''Describe the cropping area of an image from the corners of its square.
+    '''
+    return {
+        "top_left": coordinatearray_to_dict(bounds[0]),
+        "top_right": coordinatearray_to_dict(bounds[1]),
+        "bottom_right": coordinatearray_to_dict(bounds[2]),
+        "bottom_left": coordinatearray_to_dict(bounds[3]),
+        "source_file": source_file
+    }
+
 def get_optimal_croposition(cropping_rectangle, img_dimensions, orientation="square"):
     '''Find the optimal position of the square to crop given a rough placement by hand.
     '''
@@ -232,18 +386,212 @@ def get_optimal_croposition(cropping_rectangle, img_dimensions, orientation="squ
     raise ValueError(f"Orientation {orientation} not supported.")
     
     
+# helpers crop suggestion
+def score_saliency(image, work_size=SALIENCY_SIZE):
+    '''Return the edge density of a grey, downscaled copy of an image and the downscaling factor.
+    '''
+    factor = max(1, min(image.shape[:2]) // work_size)
+    if image.dtype == np.uint8 : small = box_reduce(image, factor)
+    else : small = image[::factor, ::factor]
+    grey = small.astype(np.float32)
+    if grey.ndim == 3 : grey = grey[:, :, :3].mean(axis=2)
+    edges = np.zeros_like(grey)
+    edges[:, 1:] += np.abs(np.diff(grey, axis=1))
+    edges[1:, :] += np.abs(np.diff(grey, axis=0))
+    return edges, factor
+
+def suggest_croposition(image, work_size=SALIENCY_SIZE):
+    '''Propose the square with the most edges along the long axis, as corners like `get_optimal_croposition`.
+    '''
+    height, width = image.shape[:2]
+    if height > width:
+        # we just switch axes like for vertical images in get_optimal_croposition
+        return np.flip(suggest_croposition(np.swapaxes(image, 0, 1), work_size=work_size), 1)
+    edges, factor = score_saliency(image, work_size=work_size)
+    # sum of the edges of each square along the long axis
+    side = edges.shape[0]
+    cumulated = np.concatenate([[0], np.cumsum(edges.sum(axis=0))])
+    window_sums = cumulated[side:] - cumulated[:-side]
+    # of equally good squares the most central one is taken, e.g. for plain images
+    best = np.flatnonzero(window_sums >= window_sums.max() * (1 - 1e-6))
+    position = best[np.argmin(np.abs(best - (len(window_sums) - 1) / 2))]
+    left = min(int(position) * factor, width - height)
+    return np.array([
+        [0, left],
+        [height, left],
+        [height, left + height],
+        [0, left + height]
+    ])
+
 # helpers ImageCropper
 def rescale_to_square(image, square_pixel_size=550):
     '''Rescale an image to a square.
+
+    The result is uint8, image writers do not take the float images of resize.
     '''
     from skimage.transform import resize
+    from skimage.util import img_as_ubyte
     rescaled_image = resize(
         image, 
         (square_pixel_size, square_pixel_size),
         anti_aliasing=True)
-    return rescaled_image
+    return img_as_ubyte(rescaled_image)
+
+def box_reduce(image, factor):
+    '''Shrink a uint8 image by an integer factor, each pixel becomes the mean of its box.
+
+    Rows and columns at the end that do not fill a whole box are dropped.
+    '''
+    if factor <= 1 : return image
+    height = image.shape[0] // factor
+    width = image.shape[1] // factor
+    # splitting the axes keeps a view of the image, only the sums are allocated
+    boxes = image[:height * factor, :width * factor].reshape(
+        height, factor, width, factor, *image.shape[2:])
+    sums = boxes.sum(axis=(1, 3), dtype=np.uint32)
+    return ((sums + factor * factor // 2) // (factor * factor)).astype(np.uint8)
+
+def rescale_to_square_box(image, square_pixel_size=550):
+    '''Rescale an image to a square, uint8 images are box filtered by integer factors first.
+
+    The box filter leaves at least twice the square size for the final
+    anti-aliased resample, which runs on the small image only.
+    '''
+    if image.dtype != np.uint8 : return rescale_to_square(image, square_pixel_size=square_pixel_size)
+    from skimage.transform import resize
+    factor = min(image.shape[0], image.shape[1]) // (2 * square_pixel_size)
+    reduced = box_reduce(image, factor)
+    rescaled_image = resize(
+        reduced,
+        (square_pixel_size, square_pixel_size),
+        anti_aliasing=True,
+        preserve_range=True)
+    return np.clip(np.rint(rescaled_image), 0, 255).astype(np.uint8)
+
+# resize engines by name, "box" needs much less memory for large photos
+RESIZE_ENGINES = {
+    "skimage": rescale_to_square,
+    "box": rescale_to_square_box,
+}
+
+# helpers NapariIMG pyramids
+def make_pyramid(image, min_size=PYRAMID_MIN_SIZE):
+    '''Halve an image until its longer side is at most `min_size`, returns all levels from full resolution down.
+    '''
+    levels = [image]
+    while max(levels[-1].shape[:2]) > min_size:
+        if image.dtype == np.uint8 : levels.append(box_reduce(levels[-1], 2))
+        else : levels.append(levels[-1][::2, ::2])
+    return levels
+
+def get_pyramid_dir(image_name, cache_dir=None):
+    '''Return the cache directory of the pyramid of an image.
+    '''
+    if cache_dir is None : cache_dir = INDEX_DICT["BUILD_CACHE"]["PYRAMIDS"]
+    return os.path.join(cache_dir, hash_bytes(os.path.abspath(image_name).encode("utf-8")))
+
+def read_pyramid_key(pyramid_dir):
+    '''Return the source image and the key of a cached pyramid, None for interrupted builds.
+    '''
+    try:
+        with open(os.path.join(pyramid_dir, PYRAMID_KEY_FILE), "r") as kf:
+            return json.load(kf)
+    except (FileNotFoundError, ValueError) : return None
+
+def load_pyramid(image_name, cache_dir=None, min_size=PYRAMID_MIN_SIZE):
+    '''Load the pyramid of an image from the cache, it is only built if the image changed.
+
+    The levels are memory mapped, so napari and the cropper only read
+    the parts of the image they show or crop. The first level is an
+    uncompressed copy of the image (about 120 MB for 40 MP), so the
+    cache has to be pruned now and then (see `prune_pyramids`).
+    '''
+    pyramid_dir = get_pyramid_dir(image_name, cache_dir=cache_dir)
+    stat = os.stat(image_name)
+    entry = {"source": os.path.abspath(image_name),
+             "key": f"{stat.st_size}:{stat.st_mtime_ns}:{min_size}"}
+    key_file = os.path.join(pyramid_dir, PYRAMID_KEY_FILE)
+    if read_pyramid_key(pyramid_dir) != entry:
+        os.makedirs(pyramid_dir, exist_ok=True)
+        for fl in os.listdir(pyramid_dir) : os.remove(os.path.join(pyramid_dir, fl))
+        levels = make_pyramid(io.imread(image_name), min_size=min_size)
+        for i, level in enumerate(levels):
+            np.save(os.path.join(pyramid_dir, f"level_{i}.npy"), level)
+        # the key is written last, an interrupted build is made again
+        with open(key_file, "w") as kf:
+            json.dump(entry, kf)
+    # the time of the key is the last use of the pyramid for pruning
+    else : os.utime(key_file)
+    level_files = sorted((fl for fl in os.listdir(pyramid_dir) if fl.startswith("level_")),
+                         key=lambda fl: int(fl[len("level_"):-len(".npy")]))
+    return [np.load(os.path.join(pyramid_dir, fl), mmap_mode="r") for fl in level_files]
+
+def prune_pyramids(cache_dir=None, max_bytes=None):
+    '''Remove the pyramids of images that are gone, and the least recently used ones beyond `max_bytes`.
+
+    Returns the number of removed pyramids and the bytes they took.
+    '''
+    if cache_dir is None : cache_dir = INDEX_DICT["BUILD_CACHE"]["PYRAMIDS"]
+    if not os.path.isdir(cache_dir) : return 0, 0
+    removed_count = removed_bytes = 0
+    # (last use, size, directory) of the pyramids that are kept for now
+    entries = []
+    for dir_name in os.listdir(cache_dir):
+        pyramid_dir = os.path.join(cache_dir, dir_name)
+        if not os.path.isdir(pyramid_dir) : continue
+        size = sum(os.path.getsize(os.path.join(pyramid_dir, fl)) for fl in os.listdir(pyramid_dir))
+        entry = read_pyramid_key(pyramid_dir)
+        # e.g. the source was renamed, moved or deleted, or the build was interrupted
+        if entry is None or not os.path.exists(entry["source"]):
+            shutil.rmtree(pyramid_dir)
+            removed_count += 1
+            removed_bytes += size
+            continue
+        entries.append((os.path.getmtime(os.path.join(pyramid_dir, PYRAMID_KEY_FILE)), size, pyramid_dir))
+    if max_bytes is not None:
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, pyramid_dir in sorted(entries):
+            if total_bytes <= max_bytes : break
+            shutil.rmtree(pyramid_dir)
+            total_bytes -= size
+            removed_count += 1
+            removed_bytes += size
+    return removed_count, removed_bytes
+
+# helpers CroppingSession
+def get_source_images(source_dirs=None):
+    '''List the jpg images of the source folders, by default of WIKI and NHMC.
+    '''
+    if source_dirs is None:
+        source_dirs = [INDEX_DICT["IMAGE_SOURCE_FILES"]["WIKI"], INDEX_DICT["IMAGE_SOURCE_FILES"]["NHMC"]]
+    images = []
+    for img_dir in source_dirs:
+        images.extend(os.path.join(img_dir, fl) for fl in os.listdir(img_dir) if fl.lower().endswith("jpg"))
+    return images
 
 # overall helpers
+# columns of the cropping index, files that were appended to from the
+# start have no header
+CROPPING_FIELDS = ["alias", "top_left", "top_right", "bottom_right", "bottom_left",
+                   "source_file", "cropped_file"]
+
+def read_cropping_areas(file_name):
+    '''Read the cropping areas of all images, for each alias the last one counts.
+    '''
+    cropping_dict = {}
+    with open(file_name, "r", newline="") as csvfile:
+        rows = list(csv.reader(csvfile))
+    if not rows : return cropping_dict
+    if rows[0][0] == "alias" : header, rows = rows[0], rows[1:]
+    else : header = CROPPING_FIELDS
+    for row in rows:
+        if not row : continue
+        dct = dict(zip(header, row))
+        for corner in ["top_left", "top_right", "bottom_right", "bottom_left"]:
+            dct[corner] = ast.literal_eval(dct[corner])
+        cropping_dict[dct.pop("alias")] = dct
+    return cropping_dict
+
 def save_cropping_areas(cropping_dict, file_name, force=False, append=False):
     '''Store the areas that were used for cropping of all images.
     '''
@@ -259,3 +607,18 @@ def save_cropping_areas(cropping_dict, file_name, force=False, append=False):
                 dct["alias"] = nm
                 csv_writer.writerow(dct)
     return
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Prune the cached image pyramids of napari.")
+    parser.add_argument("-m", "--max-gb", type=float, default=None,
+            help="also remove the least recently used pyramids beyond this size in GB")
+    args = parser.parse_args()
+
+    max_bytes = None if args.max_gb is None else int(args.max_gb * 1e9)
+    removed_count, removed_bytes = prune_pyramids(max_bytes=max_bytes)
+    print(f"Removed {removed_count} pyramids ({removed_bytes / 1e6:.1f} MB).")
+    return
+
+if __name__ == "__main__":
+    main()
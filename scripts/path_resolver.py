@@ -0,0 +1,78 @@
+# this file contains the resolution of all paths of the pages.
+# the directories of index.json are made absolute once, and the
+# relative links between files are memoized, as pages compute the
+# same links again and again (e.g. for each line of a tree svg).
+# all relative paths of index.json start at the scripts directory.
+
+import os
+import regex as re
+
+from __init__ import INDEX_DICT
+
+LINK_RE = re.compile(r'href="([^"]*)"')
+
+class PathResolver:
+    '''Memoized absolute and relative paths of the website.
+    '''
+    def __init__(self):
+        '''Initialize empty memos.
+        '''
+        self.clear()
+        return
+
+    def clear(self):
+        '''Drop all memoized paths (e.g. after INDEX_DICT changed).
+        '''
+        # language -> key -> absolute directory
+        self.roots = {}
+        # (target, source directory) -> relative path
+        self.relpaths = {}
+        # (link, svg directory, target directory) -> relative link
+        self.links = {}
+        return
+
+    def get_root(self, language, key):
+        '''Return the absolute directory of a key of index.json.
+        '''
+        if language not in self.roots:
+            self.roots[language] = {
+                key: os.path.abspath(path) for key, path in
+                INDEX_DICT[language]["PATHS_FROM_SCRIPTS"].items()}
+        return self.roots[language][key]
+
+    def resolve(self, language, key, *names):
+        '''Build the absolute path of a file within a directory of index.json.
+        '''
+        return os.path.join(self.get_root(language, key), *names)
+
+    def relpath(self, target, source_dir):
+        '''Return the path of a target relative to a directory.
+        '''
+        try : return self.relpaths[(target, source_dir)]
+        except KeyError:
+            rel_path = os.path.relpath(target, source_dir)
+            self.relpaths[(target, source_dir)] = rel_path
+            return rel_path
+
+    def rewrite_link(self, link, svg_base_dir, target_dir):
+        '''Rewrite a link of a svg in `svg_base_dir` to be relative to `target_dir`.
+        '''
+        try : return self.links[(link, svg_base_dir, target_dir)]
+        except KeyError:
+            link_abs = os.path.abspath(os.path.join(svg_base_dir, link))
+            link_rel = self.relpath(link_abs, target_dir)
+            self.links[(link, svg_base_dir, target_dir)] = link_rel
+            return link_rel
+
+    def rewrite_svg_line(self, svg_line, svg_base_dir, target_dir):
+        '''Rewrite the link of a line of a svg, lines without link are kept.
+        '''
+        if "href" not in svg_line : return svg_line
+        match = LINK_RE.search(svg_line)
+        if not match : return svg_line
+        link = match[1]
+        return svg_line.replace(link, self.rewrite_link(link, svg_base_dir, target_dir))
+# end PathResolver
+
+# the resolver every page of this process uses
+PATH_RESOLVER = PathResolver()
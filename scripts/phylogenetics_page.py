@@ -5,10 +5,12 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
 from __init__ import INDEX_DICT
+from path_resolver import PATH_RESOLVER
+from routes import ROUTES
+from text_catalog import TEXT_CATALOG
 
 class PhylogeneticsPage(AbstractPage):
     '''Builder class for the info page about phylogenetics.
@@ -16,8 +18,7 @@ class PhylogeneticsPage(AbstractPage):
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "phylogenetic_tree.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "phylogenetic_tree")
 
         # this can be edited.
         # so far we take a simple title.
@@ -28,20 +29,15 @@ class PhylogeneticsPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["START_AND_ERROR_HTML_DIR"],
-                f"phylogenetic_tree.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("PhylogeneticsPage", self.lang)
 
 
     def make_tree_img_path(self, non_relative=False):
         '''Build name of path for the tree image.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"],
-                f"tree.svg")
-        if non_relative : return os.path.abspath(file_name)
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        file_name = PATH_RESOLVER.resolve(self.lang, "BIRD_PLACEMENT_IMG_DIR", f"tree.svg")
+        if non_relative : return file_name
+        return self.make_relative_path(file_name)
 
     # HTML functions
     def html_body(self):
@@ -58,11 +54,8 @@ class PhylogeneticsPage(AbstractPage):
         '''
         super().define_stylesheet()
         # define path
-        css_rawpath = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["CSS_DIR"],
-                'two_columns.css')
-        css_path = os.path.relpath(os.path.abspath(css_rawpath),
-                os.path.dirname(self.make_page_path()))
+        css_rawpath = PATH_RESOLVER.resolve(self.lang, "CSS_DIR", 'two_columns.css')
+        css_path = self.make_relative_path(css_rawpath)
         # set stylesheet for two columns
         link(rel='stylesheet', href=css_path)
         return
@@ -6,11 +6,16 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
+from build_manifest import record_file, record_input
 from abstract_page import get_placement_species_list
 from __init__ import INDEX_DICT
+from path_resolver import PATH_RESOLVER
+from placement_registry import PLACEMENT_REGISTRY
+from routes import ROUTES
+from taxa_store import TAXA_STORE
+from text_catalog import TEXT_CATALOG
 
 class PlacementPage(AbstractPage):
     '''Builder class for placement page of a given bird species.
@@ -28,28 +33,28 @@ class PlacementPage(AbstractPage):
     def check_name(self, bird_name):
         '''Check if bird name is in list.
         '''
-        return self.BIRD_DATA["CODE"].str.match(bird_name).any()
+        return TAXA_STORE.has_code(self.lang, bird_name)
 
 
     def check_placementname(self, bird_name):
         '''Check if bird name occurs in the list of birds that should be
         phylogenetically placed.
         '''
-        return bird_name in get_placement_species_list(language=self.lang)
+        record_input(f"placement:{self.lang}")
+        return PLACEMENT_REGISTRY.has_species(self.lang, bird_name)
 
 
     def get_data(self):
         '''Select the data of the bird name from the whole `BIRD_DATA`.
         '''
-        self.data = self.BIRD_DATA[self.BIRD_DATA["CODE"]==self.name].squeeze()
+        self.data = self.get_bird_row(self.name)
         return
 
 
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "placement.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "placement")
 
         # this can be edited.
         # so far we take a simple title.
@@ -63,21 +68,17 @@ class PlacementPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["PLACEMENT_HTML_DIR"],
-                f"{self.name}_placement.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("PlacementPage", self.lang, self.name)
 
     def make_img_path(self, bird_name):
         '''Build name of path for a bird image.
         '''
         assert self.check_name(bird_name), f"{bird_name} is not in list."
 
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PAGE_IMG_DIR"],
-                f"{bird_name}.png")
+        file_name = PATH_RESOLVER.resolve(self.lang, "BIRD_PAGE_IMG_DIR", f"{bird_name}.png")
+        record_file(file_name)
         # return os.path.abspath(file_name)
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        return self.make_relative_path(file_name)
 
 
     def make_tree_img_path(self, bird_name, non_relative=False):
@@ -85,24 +86,18 @@ class PlacementPage(AbstractPage):
         '''
         assert self.check_name(bird_name), f"{bird_name} is not in list."
 
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"],
-                f"tree_{bird_name}_question.svg")
-        if non_relative : return os.path.abspath(file_name)
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        file_name = PLACEMENT_REGISTRY.get_species(self.lang)[bird_name].question_svg
+        if non_relative : return file_name
+        return self.make_relative_path(file_name)
 
     def make_img_link(self, bird_name):
         '''Build a link to error or success page.
         '''
         if self.name == bird_name: 
-            file_link = os.path.join(
-                    INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["PLACEMENT_HTML_DIR"],
-                    f"{self.name}_success.html")
+            file_link = ROUTES.get_route("RightPlacementPage", self.lang, self.name)
         else:
-            file_link = os.path.join(
-                    INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["START_AND_ERROR_HTML_DIR"],
-                    "error_page.html")
-        return os.path.relpath(file_link, os.path.dirname(self.make_page_path()))
+            file_link = ROUTES.get_route("ErrorPage", self.lang)
+        return self.make_relative_path(file_link)
 
     # HTML functions
     def html_body(self):
@@ -145,7 +140,7 @@ class PlacementPage(AbstractPage):
         from rephrase_svg import TightSVG
         from dominate.util import raw
         if not tree: 
-            data = self.BIRD_DATA[self.BIRD_DATA["CODE"]==bird_name].squeeze()
+            data = self.get_bird_row(bird_name)
             # get license information
             license_info = data["license notice for plain text "]
             # get license link
@@ -0,0 +1,73 @@
+# this file contains the registry of the species of the placement
+# game. a species takes part if its tree has a question svg in the
+# placement directory of a language. each directory is only listed
+# again if it changed.
+
+from collections import namedtuple
+import os
+
+from __init__ import INDEX_DICT
+from text_catalog import get_languages
+
+# svgs of a species to place, the answer svg is None if it is missing
+PlacementSpecies = namedtuple("PlacementSpecies", ["code", "question_svg", "answer_svg"])
+
+QUESTION_SUFFIX = "_question.svg"
+ANSWER_SUFFIX = "_answer.svg"
+TREE_PREFIX = "tree_"
+
+class PlacementRegistry:
+    '''Species of the placement game per language.
+    '''
+    def __init__(self):
+        '''Initialize an empty registry, directories are scanned on first use.
+        '''
+        # directory -> (modification time, CODE -> PlacementSpecies)
+        self.scans = {}
+        return
+
+    def scan(self, pm_dir):
+        '''Return the species of a placement directory, it is only listed if it changed.
+        '''
+        pm_dir = os.path.abspath(pm_dir)
+        mtime = os.stat(pm_dir).st_mtime_ns
+        if self.scans.get(pm_dir, (None,))[0] != mtime:
+            file_names = os.listdir(pm_dir)
+            answers = set(fl for fl in file_names if fl.endswith(ANSWER_SUFFIX))
+            species = {}
+            # the species keep the order of the directory listing
+            for fl in file_names:
+                if not fl.endswith(QUESTION_SUFFIX) : continue
+                code = fl.replace(TREE_PREFIX, "").replace(QUESTION_SUFFIX, "")
+                answer = f"{TREE_PREFIX}{code}{ANSWER_SUFFIX}"
+                species[code] = PlacementSpecies(
+                        code,
+                        os.path.join(pm_dir, fl),
+                        os.path.join(pm_dir, answer) if answer in answers else None)
+            self.scans[pm_dir] = (mtime, species)
+        return self.scans[pm_dir][1]
+
+    def get_species(self, language="EN"):
+        '''Return the species to place in a language as dict of CODE and PlacementSpecies.
+        '''
+        return self.scan(INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"])
+
+    def has_species(self, language, bird_name):
+        '''Check if a bird is placed in a language.
+        '''
+        return bird_name in self.get_species(language)
+
+    def get_languages(self, bird_name):
+        '''Return all languages a bird is placed in.
+        '''
+        return [lang for lang in get_languages() if self.has_species(lang, bird_name)]
+
+    def clear(self):
+        '''Drop all scanned directories.
+        '''
+        self.scans = {}
+        return
+# end PlacementRegistry
+
+# the registry every page of this process reads from
+PLACEMENT_REGISTRY = PlacementRegistry()
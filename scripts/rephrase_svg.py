@@ -1,100 +1,105 @@
 # this class helps to insert "hidden" (css) features
 # into a svg image.
 
+from io import StringIO
 import os
 import pandas as pd
 import regex as re
-import yaml
 
 from abstract_page import AbstractPage
+from build_manifest import record_file, record_input
+from build_profiler import PROFILER
 from __init__ import INDEX_DICT
+from sequence_store import get_sequence_index
+from svg_cache import make_key, SVG_CACHE
+from taxa_store import TAXA_STORE
+from text_catalog import TEXT_CATALOG
+
+# increase this if the rephrasing changes, such that cached svgs are renewed
+REPHRASE_VERSION = 1
 
 class TightSVG:
     '''This class alows to append a tree svg with notes, etc.
     '''
-    def __init__(self, svg_path, language="EN", stop_rec=False):
-        '''Initialize from svg_file.
+    def __init__(self, svg_path=None, language="EN", svg_data=None):
+        '''Initialize from svg_file or from svg data (str or bytes) in memory.
         '''
-        if not os.path.exists(svg_path):
-            raise FileNotFoundError(f"File '{svg_path}' does not exist.")
+        if svg_data is None:
+            if svg_path is None : raise ValueError("Provide an svg file or svg data.")
+            if not os.path.exists(svg_path):
+                raise FileNotFoundError(f"File '{svg_path}' does not exist.")
+            record_file(svg_path)
         self.file = svg_path
-        self.get_max_length()
+        self.tokenize(svg_data)
         self.lang = language
 
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "profile.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
-        
-        if not stop_rec : self.en = TightSVG(svg_path, stop_rec=True)
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "profile")
+        # the topic keys of the taxa table are given in english
+        self.en_texts = TEXT_CATALOG.get_texts("EN", "profile")
+        return
+
+    def tokenize(self, svg_data=None):
+        '''Split the svg in a single pass into header, prolog, a elements and postlog.
+        '''
+        if svg_data is None:
+            with open(self.file, "r") as file:
+                svg_data = file.read()
+        elif isinstance(svg_data, bytes) : svg_data = svg_data.decode("utf-8")
+        self.svg_data = svg_data
+
+        header = None
+        prolog_lines = []
+        postlog_lines = []
+        self.a_strs = []
+        a_str_lines = None
+        for line in StringIO(svg_data).readlines():
+            if header is None and line.startswith("<svg") : header = line
+            if a_str_lines is not None:
+                # we are within an a element
+                a_str_lines.append(line)
+                if line.strip().startswith("</a>"):
+                    self.a_strs.append("".join(a_str_lines))
+                    a_str_lines = None
+            elif line.strip().startswith("<a "):
+                # lines between two a elements are neither prolog nor postlog
+                a_str_lines = [line]
+                postlog_lines = []
+            elif self.a_strs : postlog_lines.append(line)
+            else : prolog_lines.append(line)
+
+        if header is None : raise RuntimeError("File is no proper svg.")
+        self.width = int(re.search('width="([0-9]*)"', header)[1])
+        self.height = int(re.search('height="([0-9]*)"', header)[1])
+        self.prolog = "".join(prolog_lines)
+        self.postlog = "".join(postlog_lines)
         return
 
     def get_max_length(self):
         '''Return the y axis length of the image in pixels.
         '''
-        with open(self.file, "r") as file:
-            for line in file.readlines():
-                if not line.startswith("<svg") : continue
-                self.width = int(re.search('width="([0-9]*)"', line)[1])
-                self.height = int(re.search('height="([0-9]*)"', line)[1])
-                return
-        raise RuntimeError("File is no proper svg.")
+        return self.width, self.height
 
     def a_elements(self):
         '''Construct a generator that iterates through all a elements.
         '''
-        file = open(self.file, "r")
-        a_str_lines = []
-        a_str_started = False
-        for line in file.readlines():
-            if not a_str_started:
-                if line.strip().startswith("<a "):
-                    a_str_started = True
-                    a_str_lines.append(line)
-            else:
-                a_str_lines.append(line)
-                if line.strip().startswith("</a>"):
-                    yield "".join(a_str_lines)
-                    a_str_lines = []
-                    a_str_started = False
-        file.close()
+        yield from self.a_strs
         return
 
     def get_prolog(self):
         '''Return part of svg before a elements.
         '''
-        file = open(self.file, "r")
-        p_str_lines = []
-        for line in file.readlines():
-            if line.strip().startswith("<a "): break
-            p_str_lines.append(line)
-        file.close()
-        prolog = "".join(p_str_lines)
-        return prolog
+        return self.prolog
 
     def get_postlog(self):
         '''Return part of svg after a elements.
         '''
-        file = open(self.file, "r")
-        p_str_lines = []
-        a_str_started = False
-        a_str_ended = False
-        for line in file.readlines():
-            if a_str_ended:
-                p_str_lines.append(line)
-                if line.strip().startswith("<a "):
-                    a_str_ended = False
-                    a_str_started = True
-                    p_str_lines = []
-            elif a_str_started:
-                a_str_ended = line.strip().startswith("</a>")
-            elif line.strip().startswith("<a "): 
-                a_str_started = True
-        postlog = "".join(p_str_lines)
-        return postlog
+        return self.postlog
 
+    @PROFILER.profiled("build_profiles")
     def build_profiles(self, image_scale_factor=4, font_size=20, max_character_per_line=40, correction=4):
         '''Build Bird profiles within a given svg image.
         '''
-        TOPICS_KEYS = self.en.texts["topickeys"]["FILL_IN"]
+        TOPICS_KEYS = self.en_texts["topickeys"]["FILL_IN"]
         TOPICS_NATIVE = self.texts["topickeys"]["FILL_IN"]
         topics =dict(zip(TOPICS_KEYS, TOPICS_NATIVE))
         first_line_correction = len(f'<tspan font-weight="bold">:</tspan>')
@@ -166,15 +171,55 @@ class TightSVG:
             profile_elements.append(a_inst.write_str())
         return "\n".join(profile_elements)
 
-    def rephrase(self, **kwargs):
+    @PROFILER.profiled("rephrase_svg")
+    def rephrase(self, use_cache=True, **kwargs):
         '''Rewrite svg image with bird profiles.
+
+        Rephrased svgs are looked up in the svg cache first.
         '''
+        if use_cache:
+            key = self.cache_key(**kwargs)
+            svg_str = SVG_CACHE.get(key)
+            if svg_str is not None : return svg_str
+
         parts = [
             self.get_prolog(),
             self.build_profiles(**kwargs),
             self.get_postlog()
                 ]
-        return "\n".join([p.strip("\n") for p in parts])
+        svg_str = "\n".join([p.strip("\n") for p in parts])
+        if use_cache : SVG_CACHE.put(key, svg_str)
+        return svg_str
+
+    def cache_key(self, **kwargs):
+        '''Build the key of the rephrased svg for the svg cache.
+
+        It covers the svg, the texts, the taxa and sequences of all
+        birds in the svg and the arguments of `build_profiles`.
+        '''
+        aliases = sorted(set(
+            alias for a_str in self.a_strs for alias in re.findall("([A-Za-z]*).png", a_str)))
+        bird_data = TAXA_STORE.get_table(self.lang)
+        taxa_index = TAXA_STORE.get_index(self.lang)
+        positions = sorted(pos for alias in aliases for pos in taxa_index.get(alias, []))
+        seq_file = os.path.join(
+                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["SEQUENCES"],
+                "list.html")
+        seq_index = get_sequence_index(seq_file)
+        seq_index.load()
+        # on a cache hit, no profile is built, so we record the inputs here
+        record_file(seq_file)
+        for alias in aliases : record_input(f"taxa:{self.lang}:{alias}")
+        return make_key(
+            REPHRASE_VERSION,
+            self.svg_data,
+            self.lang,
+            self.texts,
+            self.en_texts,
+            bird_data.iloc[positions].to_csv(index=False),
+            [seq_index.fragments.get(alias) for alias in aliases],
+            kwargs)
+
 # end TightSVG
 
 class ATeam(AbstractPage):
@@ -196,7 +241,7 @@ class ATeam(AbstractPage):
 
         # load the alias of the bird
         self.get_bird_name()
-        self.data = self.BIRD_DATA[self.BIRD_DATA["CODE"]==self.bird_alias].squeeze()
+        self.data = self.get_bird_row(self.bird_alias)
         return
 
     def split_str(self):
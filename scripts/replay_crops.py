@@ -0,0 +1,142 @@
+# this script crops and resizes all bird images again from the
+# areas in the cropping index, without napari. images are processed
+# in parallel, and a cropped image is only made again if its source,
+# its cropping area or the target size changed.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import sys
+import time
+import traceback
+
+from __init__ import INDEX_DICT
+from build_cache import file_digest, hash_bytes
+from napari_utils import ImageCropper, RESIZE_ENGINES, read_cropping_areas
+
+# edge length of the cropped images in pixels
+CROP_SIZE = 550
+
+def find_source(source_file, source_dirs):
+    '''Return the path of a source image, it is looked up by name in the source folders if it moved.
+    '''
+    if os.path.exists(source_file) : return source_file
+    file_name = os.path.basename(source_file)
+    for source_dir in source_dirs:
+        candidate = os.path.join(source_dir, file_name)
+        if os.path.exists(candidate) : return candidate
+    raise FileNotFoundError(f"Image {source_file} does not exist.")
+
+def make_output_files(alias, crop_dict, output_dir=None):
+    '''Return the paths of the resized and the raw cropped image of an alias.
+    '''
+    if output_dir is None and crop_dict.get("cropped_file"):
+        output_file = crop_dict["cropped_file"]
+    else:
+        if output_dir is None : output_dir = INDEX_DICT["IMAGE_CROPPED_FILES"]["CROPPED_IMGS"]
+        output_file = os.path.join(output_dir, f"{alias}.png")
+    return output_file, "_raw".join(os.path.splitext(output_file))
+
+def make_crop_key(source_file, crop_dict, size, engine="skimage"):
+    '''Hash everything a cropped image is made from.
+    '''
+    area = [crop_dict[corner] for corner in ["top_left", "bottom_right"]]
+    return hash_bytes(json.dumps([file_digest(source_file), area, size, engine], sort_keys=True).encode("utf-8"))
+
+def load_keys(key_file=None):
+    '''Load the keys of the cropped images of the last replay.
+    '''
+    if key_file is None : key_file = INDEX_DICT["BUILD_CACHE"]["CROPS"]
+    if not os.path.exists(key_file) : return {}
+    with open(key_file, "r") as kf:
+        return json.load(kf)
+
+def save_keys(keys, key_file=None):
+    '''Store the keys of the cropped images.
+    '''
+    if key_file is None : key_file = INDEX_DICT["BUILD_CACHE"]["CROPS"]
+    os.makedirs(os.path.dirname(key_file), exist_ok=True)
+    tmp_file = f"{key_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as kf:
+        json.dump(keys, kf, indent=1, sort_keys=True)
+    os.replace(tmp_file, key_file)
+    return
+
+def replay_crop(source_file, crop_dict, output_file, size=CROP_SIZE, engine="skimage"):
+    '''Crop, resize and save a single image.
+
+    Returns the error message or None on success.
+    '''
+    try:
+        cropper = ImageCropper(source_file)
+        cropper.crop_resize_save(
+            crop_dict["top_left"]["x"], crop_dict["bottom_right"]["x"],
+            crop_dict["top_left"]["y"], crop_dict["bottom_right"]["y"],
+            output_file,
+            resize_function=lambda image: RESIZE_ENGINES[engine](image, square_pixel_size=size),
+            force=True)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Crop all bird images again from the cropping index.")
+    parser.add_argument("-i", "--index", default=INDEX_DICT["IMAGE_CROPPED_FILES"]["CROPPING_INDEX"],
+            help="csv file with the cropping areas")
+    parser.add_argument("-o", "--output-dir", default=None,
+            help="directory of the cropped images (by default as in the cropping index)")
+    parser.add_argument("-s", "--size", type=int, default=CROP_SIZE,
+            help="edge length of the cropped images in pixels")
+    parser.add_argument("-e", "--engine", choices=sorted(RESIZE_ENGINES), default="skimage",
+            help="resize engine, 'box' needs much less memory for large photos")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count(),
+            help="number of processes that crop images in parallel")
+    parser.add_argument("-f", "--force", action="store_true",
+            help="crop all images, even if nothing changed")
+    args = parser.parse_args()
+
+    source_dirs = [INDEX_DICT["IMAGE_SOURCE_FILES"]["WIKI"], INDEX_DICT["IMAGE_SOURCE_FILES"]["NHMC"]]
+    keys = load_keys()
+    jobs = {}
+    failures = {}
+    cropping_dict = read_cropping_areas(args.index)
+    for alias, crop_dict in cropping_dict.items():
+        output_file, raw_file = make_output_files(alias, crop_dict, output_dir=args.output_dir)
+        try : source_file = find_source(crop_dict["source_file"], source_dirs)
+        except FileNotFoundError as error:
+            failures[alias] = str(error)
+            continue
+        key = make_crop_key(source_file, crop_dict, args.size, args.engine)
+        up_to_date = (keys.get(os.path.abspath(output_file)) == key
+                      and os.path.exists(output_file) and os.path.exists(raw_file))
+        if args.force or not up_to_date:
+            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+            jobs[alias] = (source_file, crop_dict, output_file, key)
+    skipped = len(cropping_dict) - len(jobs) - len(failures)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = {
+            pool.submit(replay_crop, source_file, crop_dict, output_file, args.size, args.engine): alias
+            for alias, (source_file, crop_dict, output_file, _) in jobs.items()}
+        for future in as_completed(futures):
+            alias = futures[future]
+            error = future.result()
+            if error is not None:
+                failures[alias] = error
+                continue
+            _, _, output_file, key = jobs[alias]
+            keys[os.path.abspath(output_file)] = key
+    save_keys(keys)
+
+    for alias, error in failures.items() : print(f"Failed to crop {alias}:\n{error}", file=sys.stderr)
+    seconds = time.perf_counter() - start
+    print(f"Cropped {len(jobs) - len(failures.keys() & jobs.keys())} images "
+          f"({skipped} up to date, {len(failures)} failed) in {seconds:.1f} s.")
+    if failures : sys.exit(1)
+    return
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,15 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
 from abstract_page import get_placement_species_list
+from build_manifest import record_input
 from __init__ import INDEX_DICT
+from placement_registry import PLACEMENT_REGISTRY
+from routes import ROUTES
+from taxa_store import TAXA_STORE
+from text_catalog import TEXT_CATALOG
 
 class RightPlacementPage(AbstractPage):
     '''Builder class for a given bird species.
@@ -28,26 +32,26 @@ class RightPlacementPage(AbstractPage):
     def check_name(self, bird_name):
         '''Check if bird name is in list.
         '''
-        return self.BIRD_DATA["CODE"].str.match(bird_name).any()
+        return TAXA_STORE.has_code(self.lang, bird_name)
 
     def check_placementname(self, bird_name):
         '''Check if bird name occurs in the list of birds that should be
         phylogenetically placed.
         '''
-        return bird_name in get_placement_species_list(language=self.lang)
+        record_input(f"placement:{self.lang}")
+        return PLACEMENT_REGISTRY.has_species(self.lang, bird_name)
 
     def get_data(self):
         '''Select the data of the bird name from the whole `BIRD_DATA`.
         '''
-        self.data = self.BIRD_DATA[self.BIRD_DATA["CODE"]==self.name].squeeze()
+        self.data = self.get_bird_row(self.name)
         return
 
 
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "success.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "success")
 
         # this can be edited.
         # so far, we simply take the latin name.
@@ -59,21 +63,17 @@ class RightPlacementPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["PLACEMENT_HTML_DIR"],
-                f"{self.name}_success.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("RightPlacementPage", self.lang, self.name)
 
     def make_tree_img_path(self, bird_name, non_relative=False):
         '''Build name of path for a bird image.
         '''
         assert self.check_name(bird_name), f"{bird_name} is not in list."
 
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"],
-                f"tree_{bird_name}_answer.svg")
-        if non_relative : return os.path.abspath(file_name)
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        file_name = PLACEMENT_REGISTRY.get_species(self.lang)[bird_name].answer_svg
+        assert file_name is not None, f"{bird_name} has no answer tree."
+        if non_relative : return file_name
+        return self.make_relative_path(file_name)
 
     # HTML functions
     def html_body(self):
@@ -145,9 +145,7 @@ class RightPlacementPage(AbstractPage):
     def define_infopagelink(self):
         '''Make a small button that brings the user to the info page.
         '''
-        from bird_pages import BirdPage
-        bp = BirdPage(self.name, language=self.lang, stop_html_init=True)
-        bp_path = os.path.relpath(bp.make_page_path(), os.path.dirname(self.make_page_path()))
+        bp_path = self.make_relative_path(ROUTES.get_route("BirdPage", self.lang, self.name))
         with form():
             input_(
                 type="button",
@@ -158,9 +156,7 @@ class RightPlacementPage(AbstractPage):
     def define_startplacmentlink(self):
         '''Make a small button that brings the user back to the start page for PPs.
         '''
-        from start_placement_page import StartPlacementPage
-        sp = StartPlacementPage(language=self.lang, stop_html_init=True)
-        sp_path = os.path.relpath(sp.make_page_path(), os.path.dirname(self.make_page_path()))
+        sp_path = self.make_relative_path(ROUTES.get_route("StartPlacementPage", self.lang))
         with form():
             input_(
                 type="button",
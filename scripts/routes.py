@@ -0,0 +1,63 @@
+# this file contains the route table of the website, i.e. the html
+# file of each page type, language and species. pages look up their
+# own path and their links to other pages here, instead of building
+# the other pages.
+
+from path_resolver import PATH_RESOLVER
+
+# html file of each page type as (directory key of index.json, file name),
+# "{name}" is replaced by the species of the page
+PAGE_ROUTES = {
+    "BirdPage": ("BIRD_HTML_DIR", "{name}.html"),
+    "ErrorPage": ("START_AND_ERROR_HTML_DIR", "error_page.html"),
+    "PhylogeneticsPage": ("START_AND_ERROR_HTML_DIR", "phylogenetic_tree.html"),
+    "PlacementPage": ("PLACEMENT_HTML_DIR", "{name}_placement.html"),
+    "RightPlacementPage": ("PLACEMENT_HTML_DIR", "{name}_success.html"),
+    "SequencesPage": ("START_AND_ERROR_HTML_DIR", "sequences_info.html"),
+    "StartPlacementPage": ("START_AND_ERROR_HTML_DIR", "start_placement.html"),
+    "TitlePage": ("START_AND_ERROR_HTML_DIR", "title.html"),
+}
+
+class RouteTable:
+    '''Absolute paths of all pages by page type, language and species.
+    '''
+    def __init__(self):
+        '''Initialize an empty table, routes are added on first use.
+        '''
+        self.routes = {}
+        return
+
+    def build(self, jobs):
+        '''Add the routes of all pages that are built, given as (module, class, language, bird name).
+        '''
+        for _, class_name, language, bird_name in jobs:
+            self.get_route(class_name, language, bird_name)
+        return self.routes
+
+    def update(self, routes):
+        '''Add routes of another table (e.g. of the process that started the build).
+        '''
+        self.routes.update(routes)
+        return
+
+    def get_route(self, page_type, language, name=None):
+        '''Return the absolute path of a page.
+        '''
+        dir_key, file_pattern = PAGE_ROUTES[page_type]
+        # pages without species have one route per language
+        if "{name}" not in file_pattern : name = None
+        key = (page_type, language, name)
+        if key not in self.routes:
+            self.routes[key] = PATH_RESOLVER.resolve(
+                    language, dir_key, file_pattern.format(name=name))
+        return self.routes[key]
+
+    def clear(self):
+        '''Drop all routes (e.g. after INDEX_DICT changed).
+        '''
+        self.routes = {}
+        return
+# end RouteTable
+
+# the route table every page of this process reads from
+ROUTES = RouteTable()
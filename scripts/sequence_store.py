@@ -0,0 +1,252 @@
+# this file contains the index of the short html formatted
+# sequence fragments of all birds and the packed storage
+# of the long sequences
+
+import functools
+import itertools
+import math
+import mmap
+import os
+import regex as re
+import struct
+
+from __init__ import INDEX_DICT
+from build_cache import file_signature, load_cache, save_cache
+from build_manifest import record_file
+
+class SequenceIndex:
+    '''Lookup of the sequence fragments of a list html file by bird alias.
+    '''
+    def __init__(self, list_file, cache_file=None):
+        '''Initialize from the list html file, the index is built on first use.
+        '''
+        if cache_file is None : cache_file = INDEX_DICT["BUILD_CACHE"]["SEQUENCE_INDEX"]
+        self.file = list_file
+        self.cache_file = cache_file
+        self.fragments = None
+        return
+
+    def load(self, force=False):
+        '''Load the index from cache or build it from the list file.
+        '''
+        if self.fragments is not None and not force : return
+        signature = file_signature([self.file])
+        self.fragments = load_cache(self.cache_file, signature)
+        if self.fragments is None:
+            self.fragments = self.build_index()
+            save_cache(self.cache_file, signature, self.fragments)
+        return
+
+    def build_index(self):
+        '''Map each alias of the list file to its fragment.
+        '''
+        fragments = {}
+        with open(self.file, "r") as sf:
+            for line in sf:
+                if not line.startswith("<dt>") : continue
+                short_line = line.replace("<dt>","")
+                name, seq = short_line.split("</dt>")
+                # as in a linear scan, the first entry of an alias is used
+                fragments.setdefault(name, seq)
+        return fragments
+
+    def get_sequence(self, bird_alias):
+        '''Return the html formatted fragment of a bird alias.
+        '''
+        self.load()
+        record_file(self.file)
+        try : return self.fragments[bird_alias]
+        except KeyError:
+            raise ValueError(f"There is no sequence available for {bird_alias}.")
+
+    def get_sequences(self, bird_aliases):
+        '''Return the html formatted fragments of multiple bird aliases.
+        '''
+        return [self.get_sequence(bird_alias) for bird_alias in bird_aliases]
+# end SequenceIndex
+
+# helpers
+_SEQUENCE_INDICES = {}
+
+def get_sequence_index(list_file):
+    '''Return the index of a list file that is shared within the process.
+    '''
+    list_file = os.path.abspath(list_file)
+    if list_file not in _SEQUENCE_INDICES:
+        _SEQUENCE_INDICES[list_file] = SequenceIndex(list_file)
+    return _SEQUENCE_INDICES[list_file]
+
+
+# packed long sequences
+# a packed file starts with a header (magic, number of sites, number of runs),
+# followed by the runs of characters that are no (upper case) nucleotides
+# as (start, length, character) and the nucleotides with 2 bits per site.
+PACKED_EXTENSION = "nt2"
+PACKED_MAGIC = b"NT2\x01"
+PACKED_HEADER = struct.Struct("<4sII")
+PACKED_RUN = struct.Struct("<IIc")
+NUCLEOTIDES = "ACGT"
+HTML_CHAR_RE = re.compile('<span class="nt[a-z]">([^<])</span>')
+# all 4 nucleotides that are packed into a byte, first site in the lowest bits
+BYTE_TO_NUCLEOTIDES = [
+        "".join(NUCLEOTIDES[(byte >> shift) & 3] for shift in (0, 2, 4, 6))
+        for byte in range(256)]
+
+def pack_sequence(sequence):
+    '''Pack a sequence with 2 bits per nucleotide and a list of exception runs.
+    '''
+    runs = []
+    codes = bytearray(len(sequence))
+    for i, char in enumerate(sequence):
+        code = NUCLEOTIDES.find(char)
+        if code >= 0:
+            codes[i] = code
+            continue
+        if runs and runs[-1][2] == char and runs[-1][0] + runs[-1][1] == i:
+            runs[-1][1] += 1
+        else : runs.append([i, 1, char])
+
+    # fill up to full bytes and merge 4 sites into each byte
+    codes.extend(bytes(-len(codes) % 4))
+    packed = bytes(
+            a | (c << 2) | (g << 4) | (t << 6) for a, c, g, t in
+            zip(codes[0::4], codes[1::4], codes[2::4], codes[3::4]))
+
+    header = PACKED_HEADER.pack(PACKED_MAGIC, len(sequence), len(runs))
+    run_bytes = b"".join(
+            PACKED_RUN.pack(start, length, char.encode("ascii"))
+            for start, length, char in runs)
+    return header + run_bytes + packed
+
+def unpack_sequence(data):
+    '''Restore a sequence from its packed representation.
+    '''
+    magic, length, run_count = PACKED_HEADER.unpack_from(data, 0)
+    if magic != PACKED_MAGIC : raise ValueError("Data is no packed sequence.")
+    offset = PACKED_HEADER.size
+    runs = [PACKED_RUN.unpack_from(data, offset + i*PACKED_RUN.size) for i in range(run_count)]
+    offset += run_count * PACKED_RUN.size
+
+    with memoryview(data) as view:
+        sequence = list("".join(map(BYTE_TO_NUCLEOTIDES.__getitem__, view[offset:]))[:length])
+    for start, run_length, char in runs:
+        sequence[start:start+run_length] = char.decode("ascii") * run_length
+    return "".join(sequence)
+
+def load_packed_sequence(packed_file):
+    '''Load a sequence from a packed file.
+    '''
+    with open(packed_file, "rb") as pf:
+        with mmap.mmap(pf.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return unpack_sequence(data)
+
+def render_packed_sequence(packed_file, coalesce=False):
+    '''Render the html body of a packed file.
+
+    The rendered html is shared by all pages that show the same sequence.
+    '''
+    mtime = os.stat(packed_file).st_mtime_ns
+    record_file(packed_file)
+    return _render_packed_sequence(os.path.abspath(packed_file), mtime, coalesce)
+
+@functools.lru_cache(maxsize=8)
+def _render_packed_sequence(packed_file, mtime, coalesce):
+    '''Render a packed file, the modification time only serves as cache key.
+    '''
+    return render_sequence_html(load_packed_sequence(packed_file), coalesce=coalesce)
+
+def save_packed_sequence(sequence, packed_file):
+    '''Store a sequence as a packed file.
+    '''
+    with open(packed_file, "wb") as pf:
+        pf.write(pack_sequence(sequence))
+    return
+
+def read_html_sequence(html_file):
+    '''Extract the plain sequence from a html file with colored nucleotides.
+    '''
+    with open(html_file, "r") as html:
+        return "".join(HTML_CHAR_RE.findall(html.read()))
+
+def read_html_body(html_file):
+    '''Read only the body of a html sequence file.
+
+    The file is memory-mapped, so only the body is decoded.
+    '''
+    record_file(html_file)
+    with open(html_file, "rb") as html:
+        with mmap.mmap(html.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start, end = find_body(data)
+            with memoryview(data) as view:
+                return str(view[start:end], "utf-8")
+
+def find_body(data):
+    '''Find the lines between the <body> and </body> line of html data.
+    '''
+    body_line = re.search(rb"(?m)^<body>", data)
+    if body_line is not None:
+        start = data.find(b"\n", body_line.end()) + 1
+        end_line = re.compile(rb"(?m)^</body>").search(data, start)
+        if start > 0 and end_line is not None:
+            return start, end_line.start()
+    raise RuntimeError("Html file is not proper in its structure.")
+
+def nucleotide_class(char):
+    '''Return the css class that colors a character of a sequence.
+    '''
+    if char in "ACGTacgt" : return f"nt{char.lower()}"
+    return "ntd"
+
+def render_sequence_html(sequence, line_length=100, coalesce=False):
+    '''Build the html body of a sequence with colored nucleotides.
+
+    By default, each nucleotide gets its own span, which is the same layout
+    as the html files written by eseb_seqs.cpp. With `coalesce`, runs of
+    characters with the same color share one span, which looks the same
+    but needs far less DOM nodes in the browser.
+    '''
+    return "".join(iter_sequence_html(sequence, line_length=line_length, coalesce=coalesce))
+
+def iter_sequence_html(sequence, line_length=100, coalesce=False):
+    '''Build the html body of a sequence line by line (see `render_sequence_html`).
+    '''
+    width = math.ceil(math.log10(len(sequence))) if sequence else 0
+    classes = {}
+    spans = {}
+    yield '<span class="sequence">'
+    for start in range(0, len(sequence), line_length):
+        line = [str(start).zfill(width), " "]
+        chunk = sequence[start:start+line_length]
+        for char in set(chunk).difference(classes):
+            classes[char] = nucleotide_class(char)
+            spans[char] = f'<span class="{classes[char]}">{char}</span>'
+        if coalesce:
+            for cls, run in itertools.groupby(chunk, key=classes.__getitem__):
+                line.append(f'<span class="{cls}">{"".join(run)}</span>')
+        else : line.extend(map(spans.__getitem__, chunk))
+        if start > 0 : yield "<br />\n"
+        yield "".join(line)
+    yield "</span>\n"
+    return
+
+def make_packed_path(html_file):
+    '''Build the path of the packed file that belongs to a html sequence file.
+    '''
+    return f"{os.path.splitext(html_file)[0]}.{PACKED_EXTENSION}"
+
+###############
+def main():
+    '''Pack all html sequence files that are written by eseb_seqs.cpp.
+    '''
+    seq_dir = INDEX_DICT["EN"]["PATHS_FROM_SCRIPTS"]["SEQUENCES"]
+    for fl in sorted(os.listdir(seq_dir)):
+        if not fl.endswith(".html") or fl == "list.html" : continue
+        html_file = os.path.join(seq_dir, fl)
+        sequence = read_html_sequence(html_file)
+        packed_file = make_packed_path(html_file)
+        save_packed_sequence(sequence, packed_file)
+        print(f"{packed_file} was saved ({os.path.getsize(packed_file)} of {os.path.getsize(html_file)} bytes).")
+    return
+
+if __name__ == "__main__":
+    main()
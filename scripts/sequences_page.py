@@ -5,10 +5,11 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
 from __init__ import INDEX_DICT
+from routes import ROUTES
+from text_catalog import TEXT_CATALOG
 
 class SequencesPage(AbstractPage):
     '''Builder class for the info page about dna and sequences.
@@ -24,8 +25,7 @@ class SequencesPage(AbstractPage):
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "sequences_info.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "sequences_info")
 
         # this can be edited.
         # so far we take a simple title.
@@ -36,27 +36,7 @@ class SequencesPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["START_AND_ERROR_HTML_DIR"],
-                f"sequences_info.html")
-        return os.path.abspath(file_name)
-
-
-    def load_long_sequence(self):
-        '''Obtain the long nucleotide sequence of a given bird species.
-        '''
-        EXAMPLE_BIRD = "PELCR"
-        seq_file = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["SEQUENCES"],
-                f"{EXAMPLE_BIRD}.html")
-        body = []
-        body_bool = False
-        with open(seq_file, "r") as html:
-            for line in html.readlines():
-                if line.startswith("</body>") : return "".join(body)
-                if body_bool : body.append(line)
-                elif line.startswith("<body>") : body_bool = True
-        raise RuntimeError("Html file is not proper in its structure.")
+        return ROUTES.get_route("SequencesPage", self.lang)
 
 
     # HTML functions
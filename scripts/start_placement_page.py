@@ -5,11 +5,13 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
 from abstract_page import get_placement_species_list
 from __init__ import INDEX_DICT
+from path_resolver import PATH_RESOLVER
+from routes import ROUTES
+from text_catalog import TEXT_CATALOG
 
 class StartPlacementPage(AbstractPage):
     '''Builder class for the start page fro placement game.
@@ -17,8 +19,7 @@ class StartPlacementPage(AbstractPage):
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "start_placement.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "start_placement")
 
         # this can be edited.
         # so far we take a simple title.
@@ -29,20 +30,15 @@ class StartPlacementPage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["START_AND_ERROR_HTML_DIR"],
-                f"start_placement.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("StartPlacementPage", self.lang)
 
 
     def make_tree_img_path(self, non_relative=False):
         '''Build name of path for the tree image.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"],
-                f"tree.svg")
-        if non_relative : return os.path.abspath(file_name)
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        file_name = PATH_RESOLVER.resolve(self.lang, "BIRD_PLACEMENT_IMG_DIR", f"tree.svg")
+        if non_relative : return file_name
+        return self.make_relative_path(file_name)
 
     # HTML functions
     def html_body(self):
@@ -59,11 +55,8 @@ class StartPlacementPage(AbstractPage):
         '''
         super().define_stylesheet()
         # define path
-        css_rawpath = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["CSS_DIR"],
-                'two_columns.css')
-        css_path = os.path.relpath(os.path.abspath(css_rawpath),
-                os.path.dirname(self.make_page_path()))
+        css_rawpath = PATH_RESOLVER.resolve(self.lang, "CSS_DIR", 'two_columns.css')
+        css_path = self.make_relative_path(css_rawpath)
         # set stylesheet for two columns
         link(rel='stylesheet', href=css_path)
         return
@@ -85,9 +78,7 @@ class StartPlacementPage(AbstractPage):
     def define_seq_info_link(self):
         '''Link to information page about DNA and sequencing.
         '''
-        from sequences_page import SequencesPage
-        ip_abspath = SequencesPage(language=self.lang).make_page_path()
-        ip_path = os.path.relpath(ip_abspath, os.path.dirname(self.make_page_path()))
+        ip_path = self.make_relative_path(ROUTES.get_route("SequencesPage", self.lang))
         with form():
             input_(
                 type="button",
@@ -120,14 +111,12 @@ class StartPlacementPage(AbstractPage):
         '''Plot the unknown sequences.
         '''
         from dominate.util import raw
-        from placement_pages import PlacementPage
         new_birds = get_placement_species_list(language=self.lang)
-        for i, bird in enumerate(new_birds, start=1):
-            pp = PlacementPage(bird, language=self.lang, stop_html_init=True)
-            pp_path = os.path.relpath(pp.make_page_path(), os.path.dirname(self.make_page_path()))
+        sequences = self.get_sequences(new_birds)
+        for i, (bird, sequence) in enumerate(zip(new_birds, sequences), start=1):
+            pp_path = self.make_relative_path(ROUTES.get_route("PlacementPage", self.lang, bird))
             with a(href=pp_path):
                 #p(make_seq(bird))
-                sequence = self.get_sequence(bird_name=bird)
                 sequence = sequence.replace('<dd><span',
                         '<dd>~~~<span')
                 sequence = sequence.replace('</span></dd>',
@@ -0,0 +1,72 @@
+# this script suggests the cropping areas of all source images that
+# are not cropped yet, and adds them to the cropping index. a square
+# is placed where the image has the most edges along its long axis,
+# so the curators only have to correct the outliers in napari.
+# images are scored in parallel.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import time
+import traceback
+
+from __init__ import INDEX_DICT
+from napari_utils import get_source_images, make_alias, make_crop_dict, \
+    read_cropping_areas, save_cropping_areas, suggest_croposition
+
+def suggest_crop(image_name, output_dir):
+    '''Suggest the cropping area of a single image.
+
+    Returns the cropping area and the error message (None on success).
+    '''
+    try:
+        from skimage import io
+        bounds = suggest_croposition(io.imread(image_name))
+        crop_dict = make_crop_dict(bounds, image_name)
+        crop_dict["cropped_file"] = os.path.join(output_dir, f"{make_alias(image_name)}.png")
+    except Exception:
+        return None, traceback.format_exc()
+    return crop_dict, None
+
+###############
+def main():
+    parser = argparse.ArgumentParser(description="Suggest the cropping areas of the source images.")
+    parser.add_argument("-d", "--source-dirs", nargs="+", default=None,
+            help="folders of the source images (by default WIKI and NHMC)")
+    parser.add_argument("-i", "--index", default=INDEX_DICT["IMAGE_CROPPED_FILES"]["CROPPING_INDEX"],
+            help="csv file with the cropping areas, suggestions are added to it")
+    parser.add_argument("-o", "--output-dir", default=INDEX_DICT["IMAGE_CROPPED_FILES"]["CROPPED_IMGS"],
+            help="directory of the cropped images")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count(),
+            help="number of processes that score images in parallel")
+    parser.add_argument("-f", "--force", action="store_true",
+            help="also suggest areas for images that are in the cropping index already")
+    args = parser.parse_args()
+
+    cropped = read_cropping_areas(args.index) if os.path.exists(args.index) else {}
+    source_images = get_source_images(args.source_dirs)
+    image_names = [img for img in source_images if args.force or make_alias(img) not in cropped]
+    skipped = len(source_images) - len(image_names)
+
+    start = time.perf_counter()
+    suggestions = {}
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        # map keeps the order of the images, so the index is written in order
+        results = pool.map(suggest_crop, image_names, [args.output_dir] * len(image_names))
+        for image_name, (crop_dict, error) in zip(image_names, results):
+            if error is not None:
+                failed += 1
+                print(f"Failed to suggest a cropping area for {image_name}:\n{error}", file=sys.stderr)
+                continue
+            suggestions[make_alias(image_name)] = crop_dict
+    if suggestions : save_cropping_areas(suggestions, args.index, append=True)
+
+    seconds = time.perf_counter() - start
+    print(f"Suggested {len(suggestions)} cropping areas ({skipped} cropped already, {failed} failed) "
+          f"in {seconds:.1f} s, {len(image_names) / max(seconds, 1e-9):.1f} images/s.")
+    return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# this file contains the on-disk cache of rephrased tree svgs.
+# entries are addressed by a hash of everything that goes into
+# the rephrased svg.
+
+import hashlib
+import json
+import os
+
+from __init__ import INDEX_DICT
+
+class SVGCache:
+    '''Content addressed store of rephrased svgs.
+    '''
+    def __init__(self, cache_dir=None):
+        '''Initialize with the directory of the cached svgs.
+        '''
+        if cache_dir is None : cache_dir = INDEX_DICT["BUILD_CACHE"]["REPHRASED_SVGS"]
+        self.dir = cache_dir
+        return
+
+    def make_path(self, key):
+        '''Build the path of the cached svg for a key.
+        '''
+        return os.path.join(self.dir, f"{key}.svg")
+
+    def get(self, key):
+        '''Return the cached svg of a key or None if it was not cached yet.
+        '''
+        try:
+            with open(self.make_path(key), "r") as svg_file:
+                return svg_file.read()
+        except FileNotFoundError : return None
+
+    def put(self, key, svg_str):
+        '''Store a rephrased svg under its key.
+        '''
+        if not os.path.exists(self.dir) : os.makedirs(self.dir, exist_ok=True)
+        svg_path = self.make_path(key)
+        # parallel builds must never read a half written svg
+        tmp_path = f"{svg_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as svg_file:
+            svg_file.write(svg_str)
+        os.replace(tmp_path, svg_path)
+        return
+# end SVGCache
+
+# helpers
+def make_key(*parts):
+    '''Hash all parts that define a cached entry.
+    '''
+    key_hash = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str) : part = part.encode("utf-8")
+        elif not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+        # the length avoids that different splits of the same bytes collide
+        key_hash.update(str(len(part)).encode("ascii") + b":" + part)
+    return key_hash.hexdigest()
+
+# the cache every page of this process reads from
+SVG_CACHE = SVGCache()
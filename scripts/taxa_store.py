@@ -0,0 +1,79 @@
+# this file contains the store of the taxa tables that is
+# shared by all page builders of one process
+
+import os
+import pandas as pd
+
+from __init__ import INDEX_DICT
+from build_manifest import record_input
+from build_profiler import PROFILER
+
+class TaxaStore:
+    '''Lazily loaded taxa tables per language.
+    '''
+    def __init__(self):
+        '''Initialize an empty store.
+        '''
+        self.tables = {}
+        self.mtimes = {}
+        # language -> (table, CODE -> row positions, CODE -> row)
+        self.indices = {}
+        return
+
+    def get_table(self, language="EN"):
+        '''Return the taxa table of a language.
+
+        The csv file is only parsed again if it changed on disk.
+        '''
+        csv_file = INDEX_DICT[language]["PATHS_FROM_SCRIPTS"]["BIRD_INFO"]
+        mtime = os.stat(csv_file).st_mtime_ns
+        if self.mtimes.get(language) != mtime:
+            with PROFILER.span("read_taxa_csv"):
+                self.tables[language] = pd.read_csv(csv_file, sep=";")
+            self.mtimes[language] = mtime
+        return self.tables[language]
+
+    def get_index(self, language="EN"):
+        '''Return the positions of the rows of each CODE in the taxa table of a language.
+
+        The index is renewed along with the table.
+        '''
+        table = self.get_table(language)
+        if self.indices.get(language, (None,))[0] is not table:
+            index = {}
+            for position, code in enumerate(table["CODE"]):
+                index.setdefault(code, []).append(position)
+            self.indices[language] = (table, index, {})
+        return self.indices[language][1]
+
+    def has_code(self, language, bird_name):
+        '''Check if a bird is in the taxa table of a language.
+        '''
+        return bird_name in self.get_index(language)
+
+    def get_row(self, language, bird_name):
+        '''Return the row of a bird in the taxa table of a language.
+
+        As with selecting the rows by CODE, an unknown bird gives an
+        empty and a duplicated bird a larger DataFrame.
+        '''
+        record_input(f"taxa:{language}:{bird_name}")
+        index = self.get_index(language)
+        table, _, rows = self.indices[language]
+        if bird_name not in rows:
+            positions = index.get(bird_name, [])
+            if len(positions) == 1 : rows[bird_name] = table.iloc[positions[0]]
+            else : rows[bird_name] = table.iloc[positions].squeeze()
+        return rows[bird_name]
+
+    def clear(self):
+        '''Drop all loaded tables.
+        '''
+        self.tables = {}
+        self.mtimes = {}
+        self.indices = {}
+        return
+# end TaxaStore
+
+# the store every page of this process reads from
+TAXA_STORE = TaxaStore()
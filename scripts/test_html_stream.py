@@ -0,0 +1,20 @@
+# tests of the streaming serialization of dominate documents, run them
+# with `python -m pytest` from the scripts directory.
+
+import io
+
+import dominate
+from dominate.tags import div, p
+
+from html_stream import RawStream, write_document
+
+def test_render_and_write_agree():
+    doc = dominate.document(title="PELCR")
+    with doc:
+        with div():
+            RawStream(chunks=lambda: ["<span>", "GATTACA</span>"])
+            p("Pelecanus crispus")
+    out_file = io.StringIO()
+    write_document(doc, out_file)
+    assert "<span>GATTACA</span>" in str(doc)
+    assert str(doc) == doc.render() == out_file.getvalue()
@@ -0,0 +1,65 @@
+# tests of the cropping session without napari, run them with
+# `python -m pytest` from the scripts directory.
+
+import numpy as np
+from skimage import io
+
+from napari_utils import CroppingSession, read_cropping_areas
+
+class Layer:
+    '''Layer of the viewer stand-in, it only keeps its data.
+    '''
+    def __init__(self, data):
+        '''Initialize from the data of the layer.
+        '''
+        self.data = data
+        return
+# end Layer
+
+class Viewer:
+    '''Stand-in of the napari viewer with the calls of NapariIMG.
+    '''
+    def add_image(self, data, name=None, multiscale=False):
+        '''Add an image layer.
+        '''
+        return Layer(data)
+
+    def add_shapes(self, corners, **kwargs):
+        '''Add a rectangle layer from two opposite corners or from all four.
+        '''
+        corners = np.asarray(corners)
+        if len(corners) == 2:
+            (x_min, y_min), (x_max, y_max) = corners
+            corners = np.array([[x_min, y_min], [x_min, y_max], [x_max, y_max], [x_max, y_min]])
+        return Layer([corners])
+# end Viewer
+
+def fail_on_tall_crops(image, square_pixel_size=20):
+    '''Resize a crop to a square unless it is larger than 50 pixels.
+    '''
+    if image.shape[0] > 50 : raise ValueError("crop is too large")
+    return image[:square_pixel_size, :square_pixel_size]
+
+def test_colliding_aliases_keep_their_errors_and_rows(tmp_path):
+    # all birds get the alias PELCR
+    image_names = []
+    for i, size in enumerate([60, 40, 30]):
+        (tmp_path / str(i)).mkdir()
+        image_names.append(str(tmp_path / str(i) / "Pelecanus crispus.jpg"))
+        io.imsave(image_names[-1], np.full((size, size + 10, 3), 100 + i, dtype=np.uint8))
+    index_file = str(tmp_path / "cropping.csv")
+    session = CroppingSession(image_names, str(tmp_path), rescaling_function=fail_on_tall_crops,
+                              force=True, cropping_csv_file_name=index_file)
+    for i in range(len(session)):
+        nimg = session.open_image(i, Viewer())
+        nimg.add_square()
+        nimg.plot_optimal_square()
+        session.save(nimg)
+    failures = session.close()
+
+    assert list(failures.keys()) == [image_names[0]]
+    assert "crop is too large" in failures[image_names[0]]
+    with open(index_file) as in_file : rows = in_file.read().splitlines()
+    assert len(rows) == 2
+    assert read_cropping_areas(index_file)["PELCR"]["source_file"] == image_names[2]
+    assert io.imread(str(tmp_path / "PELCR.png"))[0, 0, 0] == 102
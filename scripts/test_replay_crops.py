@@ -0,0 +1,23 @@
+# tests of the headless replay of the cropping index, run them with
+# `python -m pytest` from the scripts directory.
+
+import numpy as np
+from skimage import io
+
+from replay_crops import replay_crop
+
+def make_crop_dict(size):
+    '''Describe a square crop at the origin.
+    '''
+    return {"top_left": {"x": 0, "y": 0}, "bottom_right": {"x": size, "y": size}}
+
+def test_default_engine_writes_png(tmp_path):
+    source_file = str(tmp_path / "Pelecanus crispus.jpg")
+    io.imsave(source_file, (np.random.default_rng(1).random((60, 90, 3)) * 255).astype(np.uint8))
+    output_file = str(tmp_path / "PELCR.png")
+
+    assert replay_crop(source_file, make_crop_dict(60), output_file, size=20) is None
+    image = io.imread(output_file)
+    assert image.shape == (20, 20, 3)
+    assert image.dtype == np.uint8
+    assert io.imread(str(tmp_path / "PELCR_raw.png")).shape == (60, 60, 3)
@@ -0,0 +1,97 @@
+# this file contains the catalog of all page texts. the yml files
+# of all languages are compiled once and persisted in the build cache
+
+import os
+import yaml
+
+from __init__ import INDEX_DICT
+from build_cache import file_signature, load_cache, save_cache
+from build_manifest import record_file
+from build_profiler import PROFILER
+
+FALLBACK_LANGUAGE = "EN"
+
+class TextCatalog:
+    '''Compiled lookup of the yml texts of all languages.
+    '''
+    def __init__(self, cache_file=None):
+        '''Initialize the catalog, texts are loaded on first use.
+        '''
+        if cache_file is None : cache_file = INDEX_DICT["BUILD_CACHE"]["TEXT_CATALOG"]
+        self.cache_file = cache_file
+        self.texts = None
+        return
+
+    def yml_files(self):
+        '''List all yml files of all languages.
+        '''
+        files = []
+        for lang in get_languages():
+            text_dir = INDEX_DICT[lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"]
+            files.extend(
+                os.path.join(text_dir, fl) for fl in os.listdir(text_dir)
+                if fl.endswith(".yml"))
+        return files
+
+    def load(self, force=False):
+        '''Load the compiled texts from cache or compile them from the yml files.
+        '''
+        if self.texts is not None and not force : return
+        with PROFILER.span("load_texts"):
+            signature = file_signature(self.yml_files())
+            self.texts = load_cache(self.cache_file, signature)
+            if self.texts is None:
+                self.texts = self.compile()
+                save_cache(self.cache_file, signature, self.texts)
+        return
+
+    @PROFILER.profiled("parse_yml")
+    def compile(self):
+        '''Read all yml files and merge each language with the fallback language.
+        '''
+        raw_texts = {}
+        for lang in get_languages():
+            text_dir = INDEX_DICT[lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"]
+            raw_texts[lang] = {}
+            for fl in os.listdir(text_dir):
+                if not fl.endswith(".yml") : continue
+                with open(os.path.join(text_dir, fl), "r") as yml_file:
+                    raw_texts[lang][fl[:-len(".yml")]] = yaml.safe_load(yml_file) or {}
+
+        # keys that are not translated yet are taken from the fallback language
+        fallback = raw_texts.get(FALLBACK_LANGUAGE, {})
+        texts = {}
+        for lang, pages in raw_texts.items():
+            texts[lang] = {}
+            for page in set(fallback) | set(pages):
+                merged = dict(fallback.get(page, {}))
+                merged.update(pages.get(page, {}))
+                texts[lang][page] = merged
+        return texts
+
+    def get_texts(self, language, page):
+        '''Return all texts of a page (i.e. the name of its yml file) in a language.
+        '''
+        self.load()
+        for lang in {language, FALLBACK_LANGUAGE}:
+            text_dir = INDEX_DICT[lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"]
+            record_file(os.path.join(text_dir, f"{page}.yml"))
+        if page not in self.texts[language]:
+            raise KeyError(f"There are no texts '{page}' for language {language}.")
+        return self.texts[language][page]
+
+    def get_text(self, language, page, key):
+        '''Return a single text of a page in a language.
+        '''
+        return self.get_texts(language, page)[key]["FILL_IN"]
+# end TextCatalog
+
+# helpers
+def get_languages(index_dict=None):
+    '''Return all languages of an index, by default of index.json.
+    '''
+    if index_dict is None : index_dict = INDEX_DICT
+    return [ln for ln in index_dict.keys() if len(ln)==2]
+
+# the catalog every page of this process reads from
+TEXT_CATALOG = TextCatalog()
@@ -5,10 +5,12 @@ import dominate as dm
 from dominate.tags import *
 import os
 import pandas as pd
-import yaml
 
 from abstract_page import AbstractPage
 from __init__ import INDEX_DICT
+from path_resolver import PATH_RESOLVER
+from routes import ROUTES
+from text_catalog import TEXT_CATALOG
 
 class TitlePage(AbstractPage):
     '''Builder class for the title page.
@@ -16,8 +18,7 @@ class TitlePage(AbstractPage):
     def make_title(self):
         '''Build a title for the HTML.
         '''
-        file_texts = os.path.join(INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_TEXTS"], "title.yml")
-        self.texts = yaml.safe_load(open(file_texts, "r"))
+        self.texts = TEXT_CATALOG.get_texts(self.lang, "title")
 
         # this can be edited.
         # so far we take a simple title.
@@ -28,20 +29,15 @@ class TitlePage(AbstractPage):
     def make_page_path(self):
         '''Build name of path for html page.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["START_AND_ERROR_HTML_DIR"],
-                f"title.html")
-        return os.path.abspath(file_name)
+        return ROUTES.get_route("TitlePage", self.lang)
 
 
     def make_tree_img_path(self, non_relative=False):
         '''Build name of path for the tree image.
         '''
-        file_name = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["BIRD_PLACEMENT_IMG_DIR"],
-                f"tree.svg")
-        if non_relative : return os.path.abspath(file_name)
-        return os.path.relpath(file_name, os.path.dirname(self.make_page_path()))
+        file_name = PATH_RESOLVER.resolve(self.lang, "BIRD_PLACEMENT_IMG_DIR", f"tree.svg")
+        if non_relative : return file_name
+        return self.make_relative_path(file_name)
 
     # HTML functions
     def html_body(self):
@@ -58,11 +54,8 @@ class TitlePage(AbstractPage):
         '''
         super().define_stylesheet()
         # define path
-        css_rawpath = os.path.join(
-                INDEX_DICT[self.lang]["PATHS_FROM_SCRIPTS"]["CSS_DIR"],
-                'two_columns.css')
-        css_path = os.path.relpath(os.path.abspath(css_rawpath),
-                os.path.dirname(self.make_page_path()))
+        css_rawpath = PATH_RESOLVER.resolve(self.lang, "CSS_DIR", 'two_columns.css')
+        css_path = self.make_relative_path(css_rawpath)
         # set stylesheet for two columns
         link(rel='stylesheet', href=css_path)
         return
@@ -106,9 +99,7 @@ class TitlePage(AbstractPage):
     def link_phylogenetics_info(self):
         '''Link out to page that informs about phylogenetics.
         '''
-        from phylogenetics_page import PhylogeneticsPage
-        ip_abspath = PhylogeneticsPage(language=self.lang, stop_html_init=True).make_page_path()
-        ip_path = os.path.relpath(ip_abspath, os.path.dirname(self.make_page_path()))
+        ip_path = self.make_relative_path(ROUTES.get_route("PhylogeneticsPage", self.lang))
         with form():
             input_(
                 type="button",
@@ -119,13 +110,11 @@ class TitlePage(AbstractPage):
     def start_placement_game(self):
         '''Forward to the start page of the placement game.
         '''
-        from start_placement_page import StartPlacementPage
         from dominate.util import raw
 
         p(self.texts["maintext2"]["FILL_IN"])
          
-        sp_abspath = StartPlacementPage(language=self.lang, stop_html_init=True).make_page_path()
-        sp_path = os.path.relpath(sp_abspath, os.path.dirname(self.make_page_path()))
+        sp_path = self.make_relative_path(ROUTES.get_route("StartPlacementPage", self.lang))
         with form():
             input_(
                 type="button",